@@ -4,12 +4,16 @@ Provides API endpoints for strategy rating with Ninja Score
 """
 
 from typing import Optional
-from fastapi import APIRouter, Header
+from fastapi import APIRouter, Body, Header
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from jesse.services import auth as authenticator
 from jesse.models.BacktestSession import get_backtest_sessions
-from jesse.services.ninja_score import calculate_ninja_score, get_ninja_score_color
+from jesse.services.ninja_score import (
+    calculate_ninja_score,
+    calculate_ninja_scores_batch,
+    get_ninja_score_color
+)
 
 router = APIRouter(prefix="/rating", tags=["Rating"])
 
@@ -100,7 +104,7 @@ def get_rated_sessions(
                 }
             else:
                 # Calculate and cache for future use
-                ninja_data = calculate_ninja_score(metrics)
+                ninja_data = calculate_ninja_score(metrics).as_dict()
                 # Update session with calculated values (async, don't wait)
                 try:
                     from jesse.models.BacktestSession import BacktestSession
@@ -266,6 +270,7 @@ def get_rating_statistics(authorization: Optional[str] = Header(None)):
     ninja_scores = []
     categories = {"Excellent": 0, "Good": 0, "Satisfactory": 0, "Poor": 0}
     
+    uncached_metrics = []
     for session in sessions:
         # Use cached ninja_score if available
         if session.ninja_score is not None:
@@ -273,13 +278,24 @@ def get_rating_statistics(authorization: Optional[str] = Header(None)):
             if session.ninja_category:
                 categories[session.ninja_category] = categories.get(session.ninja_category, 0) + 1
         elif session.metrics_json:
-            # Calculate if not cached
-            try:
-                ninja_data = calculate_ninja_score(session.metrics_json)
-                ninja_scores.append(ninja_data["ninja_score"])
-                categories[ninja_data["category"]] += 1
-            except Exception:
-                continue
+            # Calculate if not cached (in one batch below)
+            uncached_metrics.append(session.metrics_json)
+    
+    if uncached_metrics:
+        try:
+            batch_scores, batch_categories = calculate_ninja_scores_batch(uncached_metrics)
+            for score, category in zip(batch_scores.tolist(), batch_categories.tolist()):
+                ninja_scores.append(score)
+                categories[category] += 1
+        except Exception:
+            # Fall back to per-session scoring to skip only the malformed metrics
+            for metrics in uncached_metrics:
+                try:
+                    ninja_result = calculate_ninja_score(metrics)
+                    ninja_scores.append(ninja_result.ninja_score)
+                    categories[ninja_result.category] += 1
+                except Exception:
+                    continue
     
     return JSONResponse({
         "total_strategies": len(ninja_scores),
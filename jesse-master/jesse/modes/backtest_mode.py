@@ -267,7 +267,7 @@ def _execute_backtest(
         
         # Calculate and cache Ninja Score for fast rating access
         from jesse.services.ninja_score import calculate_ninja_score
-        ninja_data = calculate_ninja_score(result.get('metrics', {}))
+        ninja_result = calculate_ninja_score(result.get('metrics', {}))
         
         # Update backtest session in database with results
         from jesse.models.BacktestSession import update_backtest_session_results, update_backtest_session_status, update_backtest_session_state
@@ -280,8 +280,8 @@ def _execute_backtest(
             chart_data=chart_data,
             execution_duration=result.get('execution_duration'),
             strategy_codes=strategy_codes if strategy_codes else None,
-            ninja_score=ninja_data['ninja_score'],
-            ninja_category=ninja_data['category']
+            ninja_score=ninja_result.ninja_score,
+            ninja_category=ninja_result.category
         )
         
         # Generate automatic title from strategy, timeframe, dates, and symbol
@@ -6,9 +6,11 @@ Calculates weighted strategy rating based on 13 metrics
 Categories: Excellent (≥500), Good (≥200), Satisfactory (≥0), Poor (<0)
 """
 
-from typing import Dict
+from typing import Dict, List, NamedTuple, Tuple
 import math
 
+import numpy as np
+
 # Ninja Score weights (exact from ninja.trade)
 NINJA_WEIGHTS = {
     "total_trades": 9,           # buys
@@ -26,8 +28,50 @@ NINJA_WEIGHTS = {
     "backtest_win_percentage": 10  # backtest_win_percentage
 }
 
+# Penalty magnitudes of the negative weights, resolved once at import
+_DD_PENALTY = abs(NINJA_WEIGHTS["max_drawdown_pct"])
+_LOSSES_PENALTY = abs(NINJA_WEIGHTS["max_consecutive_losses"])
+
+# Weights in NINJA_WEIGHTS order, for the batch path (already signed)
+_WEIGHTS = np.array(list(NINJA_WEIGHTS.values()), dtype=np.float64)
+# Normalization caps and upper bounds for the batch path (win rates are not clamped)
+_CAPS = np.array([10.0, 5.0, 50.0, 100.0, 50.0, 3.0, 3.0, 3.0, 0.1, 2.0, 100.0, 10.0, 100.0])
+_UPPER = np.array([1.0, 1.0, 1.0, np.inf, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, np.inf])
+
+# log(n) for small trade counts; the max-consecutive-losses estimate reads it
+# instead of calling math.log on every score. Index 0 is unused.
+_LOG_LUT_SIZE = 1025
+_LOG_LUT = (0.0,) + tuple(math.log(n) for n in range(1, _LOG_LUT_SIZE))
+_LOG_LUT_ARR = np.array(_LOG_LUT)
 
-def calculate_ninja_score(metrics: Dict) -> Dict:
+# Category boundaries, lowest category first
+_THRESHOLDS = np.array([0.0, 200.0, 500.0])
+_CATEGORIES = np.array(["Poor", "Satisfactory", "Good", "Excellent"])
+# Red (Poor), Gold (Satisfactory), Blue (Good), Green (Excellent)
+_COLORS = ("#ef4444", "#f59e0b", "#3b82f6", "#10b981")
+_COLORS_ARR = np.array(_COLORS)
+
+
+class NinjaResult(NamedTuple):
+    """
+    Ninja Score result; breakdown holds contributions in NINJA_WEIGHTS order
+    """
+    ninja_score: float
+    category: str
+    breakdown: np.ndarray
+
+    def as_dict(self) -> Dict:
+        """
+        Legacy dictionary form with a labeled breakdown
+        """
+        return {
+            "ninja_score": self.ninja_score,
+            "category": self.category,
+            "breakdown": dict(zip(NINJA_WEIGHTS, self.breakdown.tolist()))
+        }
+
+
+def calculate_ninja_score(metrics: Dict) -> NinjaResult:
     """
     Calculate Ninja Score for a strategy based on metrics
     
@@ -35,17 +79,13 @@ def calculate_ninja_score(metrics: Dict) -> Dict:
         metrics: Dictionary with strategy metrics from backtest session
         
     Returns:
-        Dictionary with:
+        NinjaResult with:
             - ninja_score: Calculated score
             - category: "Excellent", "Good", "Satisfactory", or "Poor"
-            - breakdown: Individual metric contributions
+            - breakdown: Individual metric contributions (use as_dict() for labels)
     """
     if not metrics:
-        return {
-            "ninja_score": 0,
-            "category": "Poor",
-            "breakdown": {}
-        }
+        return NinjaResult(0, "Poor", np.empty(0))
     
     # Extract metrics with defaults
     total_trades = metrics.get("total_trades", 0)
@@ -65,81 +105,71 @@ def calculate_ninja_score(metrics: Dict) -> Dict:
     # Max consecutive losses (approximate from win rate and total trades)
     max_consecutive_losses = 0
     if total_trades > 0 and win_rate < 100:
-        losing_trades = total_trades * (1 - win_rate / 100)
-        if losing_trades > 0:
+        loss_ratio = 1 - win_rate / 100
+        if total_trades * loss_ratio > 0:
             # Estimate max consecutive losses
-            max_consecutive_losses = int(math.log(total_trades) * (1 - win_rate / 100) * 2)
+            if type(total_trades) is int and total_trades < _LOG_LUT_SIZE:
+                log_trades = _LOG_LUT[total_trades]
+            else:
+                log_trades = math.log(total_trades)
+            max_consecutive_losses = int(log_trades * loss_ratio * 2)
     
     # Backtest win percentage (same as win_rate for Jesse)
     backtest_win_percentage = win_rate
     
     # Calculate individual contributions
-    breakdown = {}
     score = 0.0
     
     # Total trades contribution
     trades_score = min(total_trades / 10.0, 1.0) * NINJA_WEIGHTS["total_trades"]
-    breakdown["total_trades"] = trades_score
     score += trades_score
     
     # Average profit contribution
     avg_prof_score = min(avg_profit_pct / 5.0, 1.0) * NINJA_WEIGHTS["avg_profit_pct"]
-    breakdown["avg_profit_pct"] = avg_prof_score
     score += avg_prof_score
     
     # Total profit contribution
     tot_prof_score = min(total_profit_pct / 50.0, 1.0) * NINJA_WEIGHTS["total_profit_pct"]
-    breakdown["total_profit_pct"] = tot_prof_score
     score += tot_prof_score
     
     # Win rate contribution
     win_rate_score = (win_rate / 100.0) * NINJA_WEIGHTS["win_rate"]
-    breakdown["win_rate"] = win_rate_score
     score += win_rate_score
     
     # Max drawdown contribution (negative)
-    dd_score = -min(max_drawdown_pct / 50.0, 1.0) * abs(NINJA_WEIGHTS["max_drawdown_pct"])
-    breakdown["max_drawdown_pct"] = dd_score
+    dd_score = -min(max_drawdown_pct / 50.0, 1.0) * _DD_PENALTY
     score += dd_score
     
     # Sharpe ratio contribution
     sharpe_score = min(sharpe_ratio / 3.0, 1.0) * NINJA_WEIGHTS["sharpe_ratio"]
-    breakdown["sharpe_ratio"] = sharpe_score
     score += sharpe_score
     
     # Sortino ratio contribution
     sortino_score = min(sortino_ratio / 3.0, 1.0) * NINJA_WEIGHTS["sortino_ratio"]
-    breakdown["sortino_ratio"] = sortino_score
     score += sortino_score
     
     # Calmar ratio contribution
     calmar_score = min(calmar_ratio / 3.0, 1.0) * NINJA_WEIGHTS["calmar_ratio"]
-    breakdown["calmar_ratio"] = calmar_score
     score += calmar_score
     
     # Expectancy contribution
     expectancy_score = min(expectancy / 0.1, 1.0) * NINJA_WEIGHTS["expectancy"]
-    breakdown["expectancy"] = expectancy_score
     score += expectancy_score
     
     # Profit factor contribution
     pf_score = min(profit_factor / 2.0, 1.0) * NINJA_WEIGHTS["profit_factor"]
-    breakdown["profit_factor"] = pf_score
     score += pf_score
     
     # CAGR contribution
     cagr_score = min(cagr / 100.0, 1.0) * NINJA_WEIGHTS["cagr"]
-    breakdown["cagr"] = cagr_score
     score += cagr_score
     
     # Max consecutive losses contribution (negative)
-    losses_score = -min(max_consecutive_losses / 10.0, 1.0) * abs(NINJA_WEIGHTS["max_consecutive_losses"])
-    breakdown["max_consecutive_losses"] = losses_score
+    losses_score = -min(max_consecutive_losses / 10.0, 1.0) * _LOSSES_PENALTY
     score += losses_score
     
     # Backtest win percentage contribution
     bwp_score = (backtest_win_percentage / 100.0) * NINJA_WEIGHTS["backtest_win_percentage"]
-    breakdown["backtest_win_percentage"] = bwp_score
     score += bwp_score
     
     # Determine category
@@ -152,11 +182,81 @@ def calculate_ninja_score(metrics: Dict) -> Dict:
     else:
         category = "Poor"
     
-    return {
-        "ninja_score": round(score, 2),
-        "category": category,
-        "breakdown": breakdown
-    }
+    breakdown = np.array((
+        trades_score, avg_prof_score, tot_prof_score, win_rate_score, dd_score,
+        sharpe_score, sortino_score, calmar_score, expectancy_score, pf_score,
+        cagr_score, losses_score, bwp_score
+    ))
+    
+    return NinjaResult(round(score, 2), category, breakdown)
+
+
+def calculate_ninja_scores_batch(metrics_list: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calculate Ninja Scores for many strategies at once
+
+    Gives the same scores and categories as calling calculate_ninja_score on
+    each item, but normalizes all metrics into an (N, 13) matrix and scores
+    every strategy with column-wise array operations instead of N Python calls.
+    Useful when rating large sets of optimization trials.
+
+    Args:
+        metrics_list: List of metrics dictionaries (empty or None items score 0, "Poor")
+
+    Returns:
+        Tuple of (scores rounded to 2 decimals, category names)
+    """
+    n = len(metrics_list)
+    metrics_list = [m or {} for m in metrics_list]
+
+    def column(key: str) -> np.ndarray:
+        return np.fromiter((m.get(key, 0.0) for m in metrics_list), dtype=np.float64, count=n)
+
+    total_trades = column("total_trades")
+    total_profit_pct = column("total_net_profit_percentage")
+    win_rate = column("win_rate")
+
+    # Max consecutive losses (same estimate as calculate_ninja_score)
+    has_losses = (total_trades > 0) & (win_rate < 100)
+    log_trades = np.log(total_trades, out=np.zeros(n), where=has_losses)
+    # same table as the scalar path, so both agree bit-for-bit on common trade counts
+    in_lut = has_losses & (total_trades < _LOG_LUT_SIZE) & (total_trades == np.floor(total_trades))
+    log_trades[in_lut] = _LOG_LUT_ARR[total_trades[in_lut].astype(np.intp)]
+    max_consecutive_losses = np.where(has_losses, np.trunc(log_trades * (1 - win_rate / 100) * 2), 0.0)
+
+    m = np.empty((n, len(NINJA_WEIGHTS)), dtype=np.float64)
+    m[:, 0] = total_trades
+    m[:, 1] = total_profit_pct / np.maximum(total_trades, 1)
+    m[:, 2] = total_profit_pct
+    m[:, 3] = win_rate
+    m[:, 4] = np.abs(column("max_drawdown_percentage"))
+    m[:, 5] = column("sharpe_ratio")
+    m[:, 6] = column("sortino_ratio")
+    m[:, 7] = column("calmar_ratio")
+    m[:, 8] = column("expectancy")
+    m[:, 9] = column("profit_factor")
+    m[:, 10] = column("cagr")
+    m[:, 11] = max_consecutive_losses
+    m[:, 12] = win_rate
+
+    m /= _CAPS
+    np.minimum(m, _UPPER, out=m)
+    m *= _WEIGHTS
+
+    # Accumulate in metric order (rather than m @ _WEIGHTS) so the sums are
+    # bit-identical to calculate_ninja_score and categories agree at boundaries
+    scores = np.zeros(n, dtype=np.float64)
+    for j in range(m.shape[1]):
+        scores += m[:, j]
+
+    # Categories come from the unrounded score, like the scalar path
+    categories = _CATEGORIES[np.searchsorted(_THRESHOLDS, scores, side='right')]
+    categories[[not metrics for metrics in metrics_list]] = "Poor"
+
+    # Python's round() matches the scalar path exactly; np.round can differ in the last digit
+    rounded = np.fromiter((round(score, 2) for score in scores.tolist()), dtype=np.float64, count=n)
+
+    return rounded, categories
 
 
 def get_ninja_score_color(score: float) -> str:
@@ -170,11 +270,28 @@ def get_ninja_score_color(score: float) -> str:
         Color hex code
     """
     if score >= 500:
-        return "#10b981"  # Green (Excellent)
+        return _COLORS[3]
     elif score >= 200:
-        return "#3b82f6"  # Blue (Good)
+        return _COLORS[2]
     elif score >= 0:
-        return "#f59e0b"  # Gold (Satisfactory)
+        return _COLORS[1]
     else:
-        return "#ef4444"  # Red (Poor)
+        return _COLORS[0]
+
+
+def get_ninja_score_colors(scores: np.ndarray) -> np.ndarray:
+    """
+    Get colors for an array of Ninja Scores (same mapping as get_ninja_score_color)
+    
+    Args:
+        scores: Ninja Score values
+        
+    Returns:
+        Array of color hex codes
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    idx = np.searchsorted(_THRESHOLDS, scores, side='right')
+    # NaN sorts past every threshold; the scalar version treats it as Poor
+    idx[np.isnan(scores)] = 0
+    return _COLORS_ARR[idx]
 
@@ -0,0 +1,64 @@
+import numpy as np
+
+import jesse.indicators as ta
+from jesse.services.cache import cached
+
+
+class StreamingIndicators:
+    """
+    Mixin for strategies that read the same few indicator values on every bar.
+    Instead of recomputing them over the whole candle history, the previous
+    result is kept in self.vars and advanced over the newly arrived candles.
+
+    Usage: class MyStrategy(StreamingIndicators, Strategy)
+    """
+
+    @property
+    @cached
+    def _bar_candles(self) -> np.ndarray:
+        """
+        Candles of the current bar. self.candles is rebuilt from the store on
+        every access while @cached is cleared by the framework after each bar.
+        """
+        return self.candles
+
+    def _ema_last(self, candles: np.ndarray, period: int) -> float:
+        """
+        Last value of EMA(close). The stored value is advanced over the new
+        candles with the same recurrence ta.ema uses, so the result is bit-for-bit
+        identical to ta.ema(candles, period)[-1].
+        """
+        # period -> (number of candles, timestamp of the last one, EMA)
+        states = self.vars.setdefault('ema_state', {})
+        n = len(candles)
+        state = states.get(period)
+        if state is None or state[0] > n or candles[state[0] - 1, 0] != state[1]:
+            # first call, or the candle history has shifted: compute it in full
+            value = ta.ema(candles, period=period, sequential=True)[-1]
+        else:
+            value = state[2]
+            alpha = 2 / (period + 1)
+            for close in candles[state[0]:, 2].tolist():
+                value = alpha * close + (1 - alpha) * value
+        states[period] = (n, candles[-1, 0], value)
+        return value
+
+    def _volume_means(self, candles: np.ndarray) -> tuple:
+        """
+        Mean volume of the last 12 candles and of the 23 candles before the
+        current one. The sums are shifted by one candle per bar instead of
+        slicing and averaging twice. Set self.vars['volume_sums'] to None to
+        force a full recomputation (e.g. on every new position, so that rounding
+        error does not carry over between trades).
+        """
+        # (number of candles, timestamp of the last one, sum of 12, sum of 23)
+        state = self.vars.get('volume_sums')
+        n = len(candles)
+        if state is not None and state[0] == n - 1 and candles[-2, 0] == state[1]:
+            sum_12 = state[2] + candles[-1, 5] - candles[-13, 5]
+            sum_23 = state[3] + candles[-2, 5] - candles[-25, 5]
+        else:
+            sum_12 = candles[-12:, 5].sum()
+            sum_23 = candles[-24:-1, 5].sum()
+        self.vars['volume_sums'] = (n, candles[-1, 0], sum_12, sum_23)
+        return sum_12 / 12, sum_23 / 23
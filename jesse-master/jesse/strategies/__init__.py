@@ -1 +1,2 @@
 from .Strategy import cached, Strategy
+from .StreamingIndicators import StreamingIndicators
@@ -1,4 +1,7 @@
-from jesse.strategies import Strategy
+from collections import deque
+
+from jesse.strategies import Strategy, cached
+from jesse import utils
 
 
 class EMA_BTC_Channel_2_2_10(Strategy):
@@ -12,6 +15,12 @@ class EMA_BTC_Channel_2_2_10(Strategy):
     - Часть 3: закрытие при росте в 3 раза (200%)
     """
     
+    # Множители цен, вычисляются один раз при загрузке класса
+    _SL_FACTOR = 1 - 0.022  # стоп-лосс 2.2%
+    _TS1_FACTOR = 1 - 0.015  # трейлинг стоп части 1
+    _TS2_FACTOR = 1 - 0.006  # трейлинг стоп части 2
+    _TP3_FACTOR = 3.0  # тейк-профит части 3
+    
     def __init__(self):
         super().__init__()
         # Переменные для трейлинга
@@ -24,23 +33,60 @@ class EMA_BTC_Channel_2_2_10(Strategy):
         self.vars['entry_price'] = 0  # Цена входа
         self.vars['qty_per_part'] = 0  # Количество на каждую часть
         self.vars['highest_after_entry'] = 0  # Максимальная цена после входа
+        self.vars['current_stop'] = 0  # Цена текущего стоп-лосса (без разбора self.stop_loss)
+        # Монотонная очередь (index, high) для скользящего максимума
+        self.vars['roll_highs'] = deque()
+        self.vars['roll_next_index'] = 0  # Индекс следующей необработанной свечи
+    
+    @property
+    @cached
+    def _bar_candles(self):
+        """
+        Свечи текущего бара: self.candles собирается в store при каждом обращении,
+        а кеш @cached сбрасывается фреймворком после каждого бара
+        """
+        return self.candles
+    
+    def _period_high(self, lookback_period: int) -> float:
+        """
+        Скользящий максимум high за последние lookback_period свечей.
+        Монотонная очередь: каждая свеча добавляется и удаляется один раз,
+        поэтому амортизированно O(1) на бар вместо пересканирования окна.
+        """
+        candles = self._bar_candles
+        n = len(candles)
+        roll_highs = self.vars['roll_highs']
+        
+        # Добавляем свечи, появившиеся с прошлого вызова
+        for i in range(self.vars['roll_next_index'], n):
+            high = candles[i, 2]
+            while roll_highs and roll_highs[-1][1] <= high:
+                roll_highs.pop()
+            roll_highs.append((i, high))
+        self.vars['roll_next_index'] = n
+        
+        # Убираем свечи, вышедшие за окно
+        window_start = n - lookback_period
+        while roll_highs[0][0] < window_start:
+            roll_highs.popleft()
+        
+        return float(roll_highs[0][1])
     
     def should_long(self) -> bool:
         """
         Условие для входа в лонг:
         Если цена падает на 3% от максимума за период
         """
-        if len(self.candles) < 2:
+        if len(self._bar_candles) < 2:
             return False
         
         current_price = self.close
         
         # Находим максимум за последние свечи
-        lookback_period = min(50, len(self.candles) - 1)  # До 50 свечей
+        lookback_period = min(50, len(self._bar_candles) - 1)  # До 50 свечей
         
         # Находим максимум за период
-        high_prices = [c[2] for c in self.candles[-lookback_period:]]  # high
-        period_high = max(high_prices)
+        period_high = self._period_high(lookback_period)
         
         # Сохраняем максимум для отслеживания
         if period_high > self.vars['highest_price']:
@@ -63,8 +109,6 @@ class EMA_BTC_Channel_2_2_10(Strategy):
         """
         Вход в лонг позицию - разбиваем на 3 части
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -85,8 +129,9 @@ class EMA_BTC_Channel_2_2_10(Strategy):
         self.buy = total_qty, entry_price
         
         # Стоп-лосс 2.2% ниже цены входа для всей позиции
-        stop_loss_price = entry_price * (1 - 0.022)
+        stop_loss_price = entry_price * self._SL_FACTOR
         self.stop_loss = total_qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Инициализируем переменные для трейлинга
         self.vars['highest_price'] = entry_price  # Сбрасываем максимум на цену входа
@@ -114,85 +159,80 @@ class EMA_BTC_Channel_2_2_10(Strategy):
         
         current_price = self.close
         entry_price = self.position.entry_price
-        qty_per_part = self.vars['qty_per_part']  # Используем сохраненное количество
+        v = self.vars
+        qty_per_part = v['qty_per_part']  # Используем сохраненное количество
+        
+        # Состояние читаем из self.vars один раз и записываем обратно в конце
+        highest_after_entry = v['highest_after_entry']
+        trailing_1_activated = v['trailing_1_activated']
+        trailing_2_activated = v['trailing_2_activated']
+        part1_closed = v['part1_closed']
+        part2_closed = v['part2_closed']
+        part3_closed = v['part3_closed']
         
         # Обновляем максимальную цену после входа
-        if current_price > self.vars['highest_after_entry']:
-            self.vars['highest_after_entry'] = current_price
+        if current_price > highest_after_entry:
+            highest_after_entry = current_price
         
         # Вычисляем текущую прибыль
         profit_pct = ((current_price - entry_price) / entry_price) * 100
         
         # Часть 3: закрытие при росте в 3 раза (200%)
-        if not self.vars['part3_closed'] and profit_pct >= 200.0:
+        if not part3_closed and profit_pct >= 200.0:
             # Закрываем третью часть позиции
             if self.position.qty >= qty_per_part:
                 self.broker.reduce_position_at(qty_per_part, current_price, current_price)
-                self.vars['part3_closed'] = True
+                part3_closed = True
         
         # Часть 1: активируем трейлинг стоп 1.5% при росте 3%
-        if profit_pct >= 3.0:
-            self.vars['trailing_1_activated'] = True
-        
         # Часть 2: активируем трейлинг стоп 0.6% при росте 1.5%
-        if profit_pct >= 1.5:
-            self.vars['trailing_2_activated'] = True
+        trailing_1_activated = trailing_1_activated or profit_pct >= 3.0
+        trailing_2_activated = trailing_2_activated or profit_pct >= 1.5
+        
+        # Трейлинг стопы считаются один раз за бар
+        trailing_stop_1 = highest_after_entry * self._TS1_FACTOR
+        trailing_stop_2 = highest_after_entry * self._TS2_FACTOR
         
         # Закрываем части 1 и 2 через трейлинг стоп
         # Часть 1: трейлинг стоп 1.5%
-        if self.vars['trailing_1_activated'] and not self.vars['part1_closed']:
-            trailing_stop_1 = self.vars['highest_after_entry'] * (1 - 0.015)
-            if current_price <= trailing_stop_1:
-                # Закрываем часть 1
-                if self.position.qty >= qty_per_part:
-                    self.broker.reduce_position_at(qty_per_part, current_price, current_price)
-                    self.vars['part1_closed'] = True
+        if trailing_1_activated and not part1_closed and current_price <= trailing_stop_1:
+            if self.position.qty >= qty_per_part:
+                self.broker.reduce_position_at(qty_per_part, current_price, current_price)
+                part1_closed = True
         
         # Часть 2: трейлинг стоп 0.6%
-        if self.vars['trailing_2_activated'] and not self.vars['part2_closed']:
-            trailing_stop_2 = self.vars['highest_after_entry'] * (1 - 0.006)
-            if current_price <= trailing_stop_2:
-                # Закрываем часть 2
-                if self.position.qty >= qty_per_part:
-                    self.broker.reduce_position_at(qty_per_part, current_price, current_price)
-                    self.vars['part2_closed'] = True
-        
-        # Управление основным стоп-лоссом для оставшейся позиции
-        # Базовый стоп-лосс 2.2%
-        base_stop_loss = entry_price * (1 - 0.022)
-        
-        # Вычисляем трейлинг стопы для незакрытых частей
-        trailing_stop_1 = None
-        trailing_stop_2 = None
-        
-        if self.vars['trailing_1_activated'] and not self.vars['part1_closed']:
-            trailing_stop_1 = self.vars['highest_after_entry'] * (1 - 0.015)
-        
-        if self.vars['trailing_2_activated'] and not self.vars['part2_closed']:
-            trailing_stop_2 = self.vars['highest_after_entry'] * (1 - 0.006)
-        
-        # Выбираем самый высокий стоп-лосс для защиты прибыли
-        final_stop_loss = base_stop_loss
-        if trailing_stop_1 is not None and trailing_stop_1 > final_stop_loss:
+        if trailing_2_activated and not part2_closed and current_price <= trailing_stop_2:
+            if self.position.qty >= qty_per_part:
+                self.broker.reduce_position_at(qty_per_part, current_price, current_price)
+                part2_closed = True
+        
+        # Управление основным стоп-лоссом для оставшейся позиции:
+        # базовый стоп-лосс 2.2%, поднятый трейлинг стопами незакрытых частей
+        final_stop_loss = entry_price * self._SL_FACTOR
+        if trailing_1_activated and not part1_closed and trailing_stop_1 > final_stop_loss:
             final_stop_loss = trailing_stop_1
-        if trailing_stop_2 is not None and trailing_stop_2 > final_stop_loss:
+        if trailing_2_activated and not part2_closed and trailing_stop_2 > final_stop_loss:
             final_stop_loss = trailing_stop_2
         
+        v['highest_after_entry'] = highest_after_entry
+        v['trailing_1_activated'] = trailing_1_activated
+        v['trailing_2_activated'] = trailing_2_activated
+        v['part1_closed'] = part1_closed
+        v['part2_closed'] = part2_closed
+        v['part3_closed'] = part3_closed
+        
         # Обновляем стоп-лосс только если он выше текущего
         remaining_qty = self.position.qty
         if remaining_qty > 0:
-            if self.stop_loss is not None:
-                current_stop_loss = self.stop_loss[1] if isinstance(self.stop_loss, tuple) else self.stop_loss[0][1]
-                if final_stop_loss > current_stop_loss:
-                    self.stop_loss = remaining_qty, final_stop_loss
-            else:
+            if self.stop_loss is None or final_stop_loss > v['current_stop']:
                 self.stop_loss = remaining_qty, final_stop_loss
+                v['current_stop'] = final_stop_loss
         
         # Устанавливаем тейк-профит для части 3 (при росте в 3 раза)
-        if not self.vars['part3_closed'] and remaining_qty >= qty_per_part:
-            take_profit_price_part3 = entry_price * 3.0
+        if not part3_closed and remaining_qty >= qty_per_part:
+            take_profit_price_part3 = entry_price * self._TP3_FACTOR
             self.take_profit = qty_per_part, take_profit_price_part3
-        elif self.vars['part3_closed']:
+        elif part3_closed:
             self.take_profit = None
     
     def should_cancel_entry(self) -> bool:
@@ -1,4 +1,5 @@
 from jesse.strategies import Strategy
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 
@@ -15,11 +16,22 @@ class EMA_BTC_Simple(Strategy):
     - Фильтр: EMA 50 > EMA 100 (сильный восходящий тренд)
     """
     
+    # Множители цен, вычисляются один раз при загрузке класса
+    _SL_FACTOR = 1 - 0.007  # стоп-лосс 0.7%
+    _TP_FACTOR = 1 + 0.02  # тейк-профит 2.0%
+    _TS_FACTOR = 1 - 0.006  # трейлинг стоп 0.6%
+    _TRAILING_ACTIVATION_FACTOR = 1.012  # активация трейлинга при росте 1.2%
+    
     def __init__(self):
         super().__init__()
         # Переменные для трейлинга
         self.vars['highest_price'] = 0
         self.vars['trailing_activated'] = False
+        # Цены текущих стоп-лосса и тейк-профита (без разбора self.stop_loss / self.take_profit)
+        self.vars['current_stop'] = 0
+        self.vars['current_take_profit'] = 0
+        # Число свечей за месяц; таймфрейм не меняется, считаем при первом вызове
+        self._lookback_candles = None
     
     def should_long(self) -> bool:
         """
@@ -32,14 +44,34 @@ class EMA_BTC_Simple(Strategy):
         if len(self.candles) < 100:
             return False
         
-        # Вычисляем EMA 50 и EMA 100
-        ema_50 = ta.ema(self.candles, period=50, sequential=True)
-        ema_100 = ta.ema(self.candles, period=100, sequential=True)
-        
-        current_ema_50 = ema_50[-1]
-        current_ema_100 = ema_100[-1]
         current_price = self.close
         
+        # Сначала дешевый фильтр просадки за месяц: на большинстве баров он не
+        # проходит, и EMA можно не считать
+        if self._lookback_candles is None:
+            days_back = 30
+            minutes_per_month = days_back * 24 * 60
+            self._lookback_candles = minutes_per_month // jh.timeframe_to_one_minutes(self.timeframe)
+        lookback_candles = self._lookback_candles
+        
+        if len(self.candles) < lookback_candles + 1:
+            lookback_candles = min(len(self.candles) - 1, 100)
+        
+        if lookback_candles <= 0 or len(self.candles) <= lookback_candles:
+            return False
+        
+        # Берем цену месяц назад
+        price_month_ago = self.candles[-lookback_candles - 1][4]
+        price_drop_pct = ((price_month_ago - current_price) / price_month_ago) * 100
+        
+        # Покупка только при просадке >= 1.5% (более глубокая просадка)
+        if price_drop_pct < 1.5:
+            return False
+        
+        # Вычисляем EMA 50 и EMA 100 (только последнее значение)
+        current_ema_50 = ta.ema(self.candles, period=50)
+        current_ema_100 = ta.ema(self.candles, period=100)
+        
         # Фильтр 1: EMA 50 должна быть выше EMA 100 (восходящий тренд)
         if current_ema_50 <= current_ema_100:
             return False
@@ -51,28 +83,7 @@ class EMA_BTC_Simple(Strategy):
         # Фильтр 3: Цена должна быть близко к EMA 50 (покупка на откате, не на пике)
         # Разрешаем покупку если цена в пределах 0.3% от EMA 50
         price_to_ema50_pct = ((current_price - current_ema_50) / current_ema_50) * 100
-        if price_to_ema50_pct > 0.3:
-            return False  # Цена слишком далеко от EMA 50, ждем отката
-        
-        # Вычисляем просадку за месяц
-        timeframe_minutes = jh.timeframe_to_one_minutes(self.timeframe)
-        days_back = 30
-        minutes_per_month = days_back * 24 * 60
-        lookback_candles = minutes_per_month // timeframe_minutes
-        
-        if len(self.candles) < lookback_candles + 1:
-            lookback_candles = min(len(self.candles) - 1, 100)
-        
-        if lookback_candles > 0 and len(self.candles) > lookback_candles:
-            # Берем цену месяц назад
-            price_month_ago = self.candles[-lookback_candles - 1][4]
-            price_drop_pct = ((price_month_ago - current_price) / price_month_ago) * 100
-            
-            # Покупка при просадке >= 1.5% (более глубокая просадка)
-            if price_drop_pct >= 1.5:
-                return True
-        
-        return False
+        return price_to_ema50_pct <= 0.3  # иначе цена слишком далеко от EMA 50, ждем отката
     
     def should_short(self) -> bool:
         return False
@@ -81,8 +92,6 @@ class EMA_BTC_Simple(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -104,13 +113,15 @@ class EMA_BTC_Simple(Strategy):
         
         # Стоп-лосс 0.7% ниже цены входа (больше пространства для движения)
         # Учитываем комиссию: 0.02% (тейкер, округлено) при входе и выходе = 0.04%
-        stop_loss_price = entry_price * (1 - 0.007)
+        stop_loss_price = entry_price * self._SL_FACTOR
         self.stop_loss = qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Тейк-профит 2.0% выше цены входа
         # Комиссия: 0.02% * 2 = 0.04%, остаток 1.96% прибыли (хороший запас)
-        take_profit_price = entry_price * (1 + 0.02)
+        take_profit_price = entry_price * self._TP_FACTOR
         self.take_profit = qty, take_profit_price
+        self.vars['current_take_profit'] = take_profit_price
         
         # Инициализируем переменные для трейлинга
         self.vars['highest_price'] = entry_price
@@ -135,31 +146,25 @@ class EMA_BTC_Simple(Strategy):
             self.vars['highest_price'] = current_price
         
         # Активируем трейлинг когда цена выросла на 1.2% (защита прибыли)
-        if current_price >= entry_price * 1.012:
+        if current_price >= entry_price * self._TRAILING_ACTIVATION_FACTOR:
             self.vars['trailing_activated'] = True
         
         # Если трейлинг активирован, обновляем стоп-лосс и тейк-профит
         if self.vars['trailing_activated']:
             # Трейлинг стоп: отступ 0.6% от максимальной цены на рост
             # Больший отступ для более длинных движений
-            trailing_stop_price = self.vars['highest_price'] * (1 - 0.006)
+            trailing_stop_price = self.vars['highest_price'] * self._TS_FACTOR
             
             # Обновляем стоп-лосс только если он выше текущего (защита прибыли)
-            if self.stop_loss is not None:
-                current_stop_loss = self.stop_loss[1] if isinstance(self.stop_loss, tuple) else self.stop_loss[0][1]
-                if trailing_stop_price > current_stop_loss:
-                    self.stop_loss = qty, trailing_stop_price
-            else:
+            if self.stop_loss is None or trailing_stop_price > self.vars['current_stop']:
                 self.stop_loss = qty, trailing_stop_price
+                self.vars['current_stop'] = trailing_stop_price
             
             # Обновляем тейк-профит: 2.0% от максимальной цены (трейлинг тейк-профит)
-            new_take_profit = self.vars['highest_price'] * (1 + 0.02)
-            if self.take_profit is not None:
-                current_take_profit = self.take_profit[1] if isinstance(self.take_profit, tuple) else self.take_profit[0][1]
-                if new_take_profit > current_take_profit:
-                    self.take_profit = qty, new_take_profit
-            else:
+            new_take_profit = self.vars['highest_price'] * self._TP_FACTOR
+            if self.take_profit is None or new_take_profit > self.vars['current_take_profit']:
                 self.take_profit = qty, new_take_profit
+                self.vars['current_take_profit'] = new_take_profit
     
     def should_cancel_entry(self) -> bool:
         return False
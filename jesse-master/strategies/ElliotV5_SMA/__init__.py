@@ -1,26 +1,36 @@
 from jesse.strategies import Strategy
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
+from numba import njit
+
+
+@njit(cache=True, fastmath=True)
+def _ewo_last(close: np.ndarray, low_last: float, fast: int, slow: int) -> float:
+    n = close.shape[0]
+    s_fast = 0.0
+    for i in range(n - fast, n):
+        s_fast += close[i]
+    s_slow = 0.0
+    for i in range(n - slow, n):
+        s_slow += close[i]
+    return ((s_fast / fast - s_slow / slow) / low_last) * 100.0
 
 
 def ewo(candles, ema_length=5, ema2_length=35):
     """
-    EWO (Elliott Wave Oscillator) индикатор
-    Использует SMA как в оригинальной стратегии Freqtrade
+    EWO (Elliott Wave Oscillator) индикатор — возвращает скаляр (последнее значение), а не массив
+    Использует SMA по close как в оригинальной стратегии Freqtrade, разница делится на low
+    Если свечей недостаточно, возвращает NaN
     """
-    if len(candles) < ema2_length:
-        return np.array([])
-    
-    # Вычисляем SMA (в оригинале используется SMA)
-    ema1 = ta.sma(candles, period=ema_length, sequential=True)
-    ema2 = ta.sma(candles, period=ema2_length, sequential=True)
+    window = max(ema_length, ema2_length)
+    if len(candles) < window:
+        return np.nan
     
-    # Вычисляем разницу в процентах от цены закрытия
-    close_prices = candles[:, 4]  # close
-    emadif = ((ema1 - ema2) / close_prices) * 100
-    
-    return emadif
+    # Ядру нужны только последние window закрытий: копируем хвост, а не весь столбец
+    close_prices = np.ascontiguousarray(candles[-window:, 2], dtype=np.float64)  # close
+    return _ewo_last(close_prices, float(candles[-1, 4]), ema_length, ema2_length)  # low
 
 
 class ElliotV5_SMA(Strategy):
@@ -32,6 +42,8 @@ class ElliotV5_SMA(Strategy):
     - Трейлинг стоп
     """
     
+    _SL_FACTOR = 1 - 0.189  # стоп-лосс -18.9%, вычисляется один раз при загрузке класса
+    
     def __init__(self):
         super().__init__()
         # Параметры из buy_params
@@ -52,10 +64,12 @@ class ElliotV5_SMA(Strategy):
         # Параметры трейлинга
         self.trailing_stop_positive = 0.005  # 0.5%
         self.trailing_stop_positive_offset = 0.03  # 3%
+        self._trailing_stop_factor = 1 - self.trailing_stop_positive
         
         # Переменные для трейлинга
         self.vars['highest_price'] = 0
         self.vars['trailing_activated'] = False
+        self.vars['current_stop'] = 0  # Цена текущего стоп-лосса (без разбора self.stop_loss)
     
     def should_long(self) -> bool:
         """
@@ -73,10 +87,9 @@ class ElliotV5_SMA(Strategy):
         current_ema_buy = ema_buy[-1]
         
         # Вычисляем EWO
-        ewo_values = ewo(self.candles, self.fast_ewo, self.slow_ewo)
-        if len(ewo_values) == 0:
+        current_ewo = ewo(self.candles, self.fast_ewo, self.slow_ewo)
+        if np.isnan(current_ewo):
             return False
-        current_ewo = ewo_values[-1]
         
         # Вычисляем RSI
         rsi = ta.rsi(self.candles, period=14, sequential=True)
@@ -104,8 +117,6 @@ class ElliotV5_SMA(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -123,8 +134,9 @@ class ElliotV5_SMA(Strategy):
         self.buy = qty, entry_price
         
         # Стоп-лосс -18.9% (из оригинальной стратегии)
-        stop_loss_price = entry_price * (1 - 0.189)
+        stop_loss_price = entry_price * self._SL_FACTOR
         self.stop_loss = qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Инициализируем переменные для трейлинга
         self.vars['highest_price'] = entry_price
@@ -170,15 +182,12 @@ class ElliotV5_SMA(Strategy):
         # Если трейлинг активирован, используем трейлинг стоп
         if self.vars['trailing_activated']:
             # Трейлинг стоп: отступ trailing_stop_positive (0.5%) от максимальной цены
-            trailing_stop_price = self.vars['highest_price'] * (1 - self.trailing_stop_positive)
+            trailing_stop_price = self.vars['highest_price'] * self._trailing_stop_factor
             
             # Обновляем стоп-лосс только если он выше текущего (защита прибыли)
-            if self.stop_loss is not None:
-                current_stop_loss = self.stop_loss[1] if isinstance(self.stop_loss, tuple) else self.stop_loss[0][1]
-                if trailing_stop_price > current_stop_loss:
-                    self.stop_loss = qty, trailing_stop_price
-            else:
+            if self.stop_loss is None or trailing_stop_price > self.vars['current_stop']:
                 self.stop_loss = qty, trailing_stop_price
+                self.vars['current_stop'] = trailing_stop_price
     
     def should_cancel_entry(self) -> bool:
         return False
@@ -1,4 +1,5 @@
-from jesse.strategies import Strategy
+from jesse.strategies import Strategy, StreamingIndicators
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
@@ -17,13 +18,30 @@ def ewo(candles, ema_length=5, ema2_length=35):
     ema2 = ta.sma(candles, period=ema2_length, sequential=True)
     
     # Вычисляем разницу в процентах от цены закрытия
+    # (на месте, в буфере ema1 — без промежуточных массивов длины N)
     close_prices = candles[:, 4]  # close
-    emadif = ((ema1 - ema2) / close_prices) * 100
+    np.subtract(ema1, ema2, out=ema1)
+    ema1 /= close_prices
+    ema1 *= 100
     
-    return emadif
+    return ema1
 
 
-class SuperNinja(Strategy):
+def ewo_last(candles, ema_length=5, ema2_length=35):
+    """
+    Последнее значение EWO — то же, что ewo(...)[-1], но обе SMA считаются
+    только по последним свечам, без массивов длины всей истории
+    Если свечей недостаточно, возвращает NaN
+    """
+    if len(candles) < ema2_length:
+        return np.nan
+    
+    sma1 = candles[-ema_length:, 2].mean()  # close
+    sma2 = candles[-ema2_length:, 2].mean()
+    return ((sma1 - sma2) / candles[-1, 4]) * 100
+
+
+class SuperNinja(StreamingIndicators, Strategy):
     """
     SuperNinja - Оптимизированная стратегия для Gate.io фьючерсов
     Основана на ElliotV5_SMA с улучшенными параметрами:
@@ -73,6 +91,8 @@ class SuperNinja(Strategy):
         # Переменные для трейлинга
         self.vars['highest_price'] = 0
         self.vars['trailing_activated'] = False
+        # Цена текущего стоп-лосса (без разбора self.stop_loss)
+        self.vars['current_stop'] = 0
     
     def should_long(self) -> bool:
         """
@@ -81,29 +101,29 @@ class SuperNinja(Strategy):
         2. ИЛИ цена ниже EMA * low_offset И EWO < ewo_low
         3. ИЛИ упрощенное условие: цена ниже EMA И EWO в допустимом диапазоне
         """
-        if len(self.candles) < max(self.slow_ewo, self.base_nb_candles_buy, 50):
+        candles = self._bar_candles
+        if len(candles) < max(self.slow_ewo, self.base_nb_candles_buy, 50):
             return False
         
         current_price = self.close
         
-        # Вычисляем EMA для входа
-        ema_buy = ta.ema(self.candles, period=self.base_nb_candles_buy, sequential=True)
-        if len(ema_buy) == 0:
+        # Вычисляем EMA для входа (потоково, без пересчета всей истории)
+        current_ema_buy = self._ema_last(candles, self.base_nb_candles_buy)
+        
+        # Каждое условие требует цену ниже EMA * low_offset, 0.995 или 0.998:
+        # если цена не ниже самого мягкого порога, EWO и RSI можно не считать
+        if not current_price < current_ema_buy * max(self.low_offset, 0.998):
             return False
-        current_ema_buy = ema_buy[-1]
         
         # Вычисляем EWO
-        ewo_values = ewo(self.candles, self.fast_ewo, self.slow_ewo)
-        if len(ewo_values) == 0:
-            return False
-        current_ewo = ewo_values[-1]
+        current_ewo = ewo_last(candles, self.fast_ewo, self.slow_ewo)
         
         # Проверяем на NaN
         if np.isnan(current_ewo) or np.isnan(current_ema_buy):
             return False
         
         # Вычисляем RSI
-        rsi = ta.rsi(self.candles, period=14, sequential=True)
+        rsi = ta.rsi(candles, period=14, sequential=True)
         if len(rsi) == 0:
             return False
         current_rsi = rsi[-1]
@@ -111,23 +131,28 @@ class SuperNinja(Strategy):
         if np.isnan(current_rsi):
             return False
         
+        # Сравнения цены с порогами EMA общие для нескольких условий — считаем один раз
+        below_low_offset = current_price < (current_ema_buy * self.low_offset)
+        below_995 = current_price < (current_ema_buy * 0.995)
+        below_998 = current_price < (current_ema_buy * 0.998)
+        
         # Условие 1: цена ниже EMA * low_offset И EWO > ewo_high И RSI < rsi_buy
         condition1 = (
-            current_price < (current_ema_buy * self.low_offset) and
+            below_low_offset and
             current_ewo > self.ewo_high and
             current_rsi < self.rsi_buy
         )
         
         # Условие 2: цена ниже EMA * low_offset И EWO < ewo_low
         condition2 = (
-            current_price < (current_ema_buy * self.low_offset) and
+            below_low_offset and
             current_ewo < self.ewo_low
         )
         
         # Условие 3: Упрощенное - цена ниже EMA И EWO в допустимом диапазоне (более гибкое)
         # Это поможет генерировать больше сделок
         condition3 = (
-            current_price < (current_ema_buy * 0.995) and  # Более мягкое условие цены
+            below_995 and  # Более мягкое условие цены
             (
                 (current_ewo > self.ewo_high_relaxed) or  # EWO выше мягкого порога
                 (current_ewo < self.ewo_low_relaxed)  # EWO ниже мягкого порога
@@ -137,7 +162,7 @@ class SuperNinja(Strategy):
         
         # Условие 4: Еще более упрощенное - только цена и RSI (для тестирования)
         condition4 = (
-            current_price < (current_ema_buy * 0.995) and
+            below_995 and
             current_rsi < 50 and  # RSI ниже 50 (перепроданность)
             current_ewo > -20 and current_ewo < 10  # EWO в разумном диапазоне
         )
@@ -145,7 +170,7 @@ class SuperNinja(Strategy):
         # Условие 5: Минимальное - только цена ниже EMA и RSI перепродан
         # Это должно генерировать сделки в большинстве случаев
         condition5 = (
-            current_price < (current_ema_buy * 0.998) and  # Очень мягкое условие
+            below_998 and  # Очень мягкое условие
             current_rsi < 45  # RSI перепродан
         )
         
@@ -158,8 +183,6 @@ class SuperNinja(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -179,6 +202,7 @@ class SuperNinja(Strategy):
         # Стоп-лосс -18.9% (из оригинальной стратегии)
         stop_loss_price = entry_price * (1 - self.stop_loss_pct)
         self.stop_loss = qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Инициализируем переменные для трейлинга
         self.vars['highest_price'] = entry_price
@@ -205,9 +229,9 @@ class SuperNinja(Strategy):
             self.vars['highest_price'] = current_price
         
         # Условие выхода: цена выше EMA * high_offset
-        if len(self.candles) >= self.base_nb_candles_sell:
-            ema_sell = ta.ema(self.candles, period=self.base_nb_candles_sell, sequential=True)
-            current_ema_sell = ema_sell[-1]
+        candles = self._bar_candles
+        if len(candles) >= self.base_nb_candles_sell:
+            current_ema_sell = self._ema_last(candles, self.base_nb_candles_sell)
             
             if current_price > (current_ema_sell * self.high_offset):
                 # Закрываем позицию
@@ -227,12 +251,9 @@ class SuperNinja(Strategy):
             trailing_stop_price = self.vars['highest_price'] * (1 - self.trailing_stop_positive)
             
             # Обновляем стоп-лосс только если он выше текущего (защита прибыли)
-            if self.stop_loss is not None:
-                current_stop_loss = self.stop_loss[1] if isinstance(self.stop_loss, tuple) else self.stop_loss[0][1]
-                if trailing_stop_price > current_stop_loss:
-                    self.stop_loss = qty, trailing_stop_price
-            else:
+            if self.stop_loss is None or trailing_stop_price > self.vars['current_stop']:
                 self.stop_loss = qty, trailing_stop_price
+                self.vars['current_stop'] = trailing_stop_price
     
     def should_cancel_entry(self) -> bool:
         return False
@@ -1,7 +1,9 @@
-from jesse.strategies import Strategy
+from jesse.strategies import Strategy, StreamingIndicators
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
+from numba import njit
 
 
 def ewo_binance(candles, ema_length=5, ema2_length=35):
@@ -23,6 +25,47 @@ def ewo_binance(candles, ema_length=5, ema2_length=35):
     return emadif
 
 
+@njit(cache=True)
+def _cti_loop(close, period):
+    """
+    Скользящая корреляция Пирсона между ценой и временем (ядро для cti)
+    """
+    n = close.shape[0]
+    cti_values = np.full(n, np.nan)
+
+    # Время в окне — это просто индексы 0..period-1, поэтому центрированное
+    # время и сумма его квадратов одинаковы для всех окон
+    mean_time = (period - 1) / 2.0
+    sum_t2 = 0.0
+    for j in range(period):
+        sum_t2 += (j - mean_time) * (j - mean_time)
+
+    for i in range(period - 1, n):
+        start = i - period + 1
+
+        sum_c = 0.0
+        for j in range(period):
+            sum_c += close[start + j]
+        mean_close = sum_c / period
+
+        # Центрируем каждое окно заново: скользящие суммы квадратов на уровне
+        # цен ~1e5 теряют точность из-за вычитания близких чисел
+        numerator = 0.0
+        sum_c2 = 0.0
+        for j in range(period):
+            dc = close[start + j] - mean_close
+            numerator += dc * (j - mean_time)
+            sum_c2 += dc * dc
+
+        denominator = np.sqrt(sum_c2 * sum_t2)
+        if denominator != 0:
+            cti_values[i] = numerator / denominator
+        else:
+            cti_values[i] = 0
+
+    return cti_values
+
+
 def cti(candles, period=20):
     """
     CTI (Correlation Trend Indicator)
@@ -30,36 +73,10 @@ def cti(candles, period=20):
     """
     if len(candles) < period:
         return np.array([])
-    
+
     close_prices = candles[:, 4]  # close
-    
-    # Создаем массив времени (индексы)
-    time_array = np.arange(len(close_prices))
-    
-    # Вычисляем скользящую корреляцию
-    cti_values = np.full(len(close_prices), np.nan)
-    
-    for i in range(period - 1, len(close_prices)):
-        window_close = close_prices[i - period + 1:i + 1]
-        window_time = time_array[i - period + 1:i + 1]
-        
-        # Корреляция Пирсона
-        if len(window_close) == period:
-            mean_close = np.mean(window_close)
-            mean_time = np.mean(window_time)
-            
-            numerator = np.sum((window_close - mean_close) * (window_time - mean_time))
-            denominator = np.sqrt(
-                np.sum((window_close - mean_close) ** 2) * 
-                np.sum((window_time - mean_time) ** 2)
-            )
-            
-            if denominator != 0:
-                cti_values[i] = numerator / denominator
-            else:
-                cti_values[i] = 0
-    
-    return cti_values
+
+    return _cti_loop(close_prices, period)
 
 
 def typical_price(candles):
@@ -72,7 +89,7 @@ def typical_price(candles):
     return (high + low + close) / 3
 
 
-class SuperNinja_binance(Strategy):
+class SuperNinja_binance(StreamingIndicators, Strategy):
     """
     SuperNinja_binance - Конвертированная стратегия binance из Freqtrade
     Использует:
@@ -121,6 +138,8 @@ class SuperNinja_binance(Strategy):
         # Переменные для отслеживания
         self.vars['enter_tag'] = ''
         self.vars['highest_price'] = 0
+        # Цена текущего стоп-лосса (без разбора self.stop_loss)
+        self.vars['current_stop'] = 0
     
     def should_long(self) -> bool:
         """
@@ -129,51 +148,63 @@ class SuperNinja_binance(Strategy):
         2. buy_1: rsi_slow < rsi_slow.shift(1) И rsi_fast < buy_rsi_fast_32 И rsi > buy_rsi_32 И close < sma_15 * buy_sma15_32 И cti < buy_cti_32
         """
         min_candles = max(200, 50, 20)  # EWO нужен 200, остальные меньше
-        if len(self.candles) < min_candles:
+        candles = self._bar_candles
+        if len(candles) < min_candles:
             return False
         
         current_price = self.close
         
-        # === Индикаторы для is_ewo ===
-        rsi_fast = ta.rsi(self.candles, period=4, sequential=True)
-        rsi = ta.rsi(self.candles, period=14, sequential=True)
-        ema_8 = ta.ema(self.candles, period=8, sequential=True)
-        ema_16 = ta.ema(self.candles, period=16, sequential=True)
-        ewo_values = ewo_binance(self.candles, 50, 200)
+        # === Ценовые части условий (дешевые) ===
+        # EMA считаются потоково; EWO — та же формула, что в ewo_binance,
+        # но только для последней свечи
+        current_ema_8 = self._ema_last(candles, 8)
+        current_ema_16 = self._ema_last(candles, 16)
+        current_ewo = (self._ema_last(candles, 50) - self._ema_last(candles, 200)) / candles[-1, 3] * 100
+        ewo_price_ok = (
+            current_price < (current_ema_8 * self.buy_ema_low) and
+            current_ewo > self.buy_ewo and
+            current_price < (current_ema_16 * self.buy_ema_high)
+        )
         
-        if len(ewo_values) == 0:
+        # SMA 15 нужна только для последней свечи — среднее последних 15 close
+        current_sma_15 = candles[-15:, 2].mean()
+        buy_1_price_ok = current_price < (current_sma_15 * self.buy_sma15_32)
+        
+        # Без ценовых условий ни is_ewo, ни buy_1 не сработают — RSI и CTI не считаем
+        if not (ewo_price_ok or buy_1_price_ok):
             return False
         
+        # === Индикаторы для is_ewo ===
+        rsi_fast = ta.rsi(candles, period=4, sequential=True)
+        rsi = ta.rsi(candles, period=14, sequential=True)
         current_rsi_fast = rsi_fast[-1]
         current_rsi = rsi[-1]
-        current_ema_8 = ema_8[-1]
-        current_ema_16 = ema_16[-1]
-        current_ewo = ewo_values[-1]
         
-        # Условие is_ewo
+        # Условие is_ewo (имеет приоритет над buy_1)
         is_ewo = (
+            ewo_price_ok and
             current_rsi_fast < self.buy_rsi_fast and
-            current_price < (current_ema_8 * self.buy_ema_low) and
-            current_ewo > self.buy_ewo and
-            current_price < (current_ema_16 * self.buy_ema_high) and
             current_rsi < self.buy_rsi
         )
+        if is_ewo:
+            self.vars['enter_tag'] = 'ewo'
+            return True
+        
+        if not buy_1_price_ok:
+            return False
         
         # === Индикаторы для buy_1 ===
-        rsi_slow = ta.rsi(self.candles, period=20, sequential=True)
-        sma_15 = ta.sma(self.candles, period=15, sequential=True)
-        cti_values = cti(self.candles, period=20)
+        rsi_slow = ta.rsi(candles, period=20, sequential=True)
+        # Каждое значение CTI зависит только от своего окна: для последнего
+        # достаточно последних 20 свечей, а не всей истории
+        cti_values = cti(candles[-20:], period=20)
         
         if len(rsi_slow) < 2 or len(cti_values) == 0 or np.isnan(cti_values[-1]):
-            # Если нет данных для buy_1, проверяем только is_ewo
-            if is_ewo:
-                self.vars['enter_tag'] = 'ewo'
-                return True
+            # Нет данных для buy_1
             return False
         
         current_rsi_slow = rsi_slow[-1]
-        prev_rsi_slow = rsi_slow[-2] if len(rsi_slow) > 1 else current_rsi_slow
-        current_sma_15 = sma_15[-1]
+        prev_rsi_slow = rsi_slow[-2]
         current_cti = cti_values[-1]
         
         # Условие buy_1
@@ -181,15 +212,9 @@ class SuperNinja_binance(Strategy):
             current_rsi_slow < prev_rsi_slow and
             current_rsi_fast < self.buy_rsi_fast_32 and
             current_rsi > self.buy_rsi_32 and
-            current_price < (current_sma_15 * self.buy_sma15_32) and
             current_cti < self.buy_cti_32
         )
         
-        # Возвращаем True если любое условие выполнено
-        if is_ewo:
-            self.vars['enter_tag'] = 'ewo'
-            return True
-        
         if buy_1:
             self.vars['enter_tag'] = 'buy_1'
             return True
@@ -203,8 +228,6 @@ class SuperNinja_binance(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -224,9 +247,13 @@ class SuperNinja_binance(Strategy):
         # Стоп-лосс -99% (очень широкий, как в оригинале)
         stop_loss_price = entry_price * (1 - self.stop_loss_pct)
         self.stop_loss = qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Инициализируем переменные
         self.vars['highest_price'] = entry_price
+        # Суммы объема пересчитываются целиком на первом баре позиции,
+        # чтобы ошибка округления не копилась между сделками
+        self.vars['volume_sums'] = None
     
     def go_short(self):
         pass
@@ -252,82 +279,79 @@ class SuperNinja_binance(Strategy):
         
         # === Deadfish Exit ===
         # Проверяем условие deadfish: низкая прибыль, узкие BB, цена выше середины BB, низкий объем
-        bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
-        if isinstance(bb, tuple) and len(bb) >= 3:
-            bb_upper = bb[0]  # upperband
-            bb_middle = bb[1]  # middleband
-            bb_lower = bb[2]  # lowerband
+        candles = self._bar_candles
+        # Нужны только последние значения: без sequential индикатор считается
+        # по последним warmup_candles_num свечам, а не по всей истории
+        current_bb_upper, current_bb_middle, current_bb_lower = ta.bollinger_bands(
+            candles, period=20, devup=2, devdn=2
+        )
+        bb_width = ((current_bb_upper - current_bb_lower) / current_bb_middle) if current_bb_middle != 0 else 0
+        
+        # Объем (скользящие средние)
+        if len(candles) >= 24:
+            if len(candles) > 24:
+                volume_mean_12, volume_mean_24 = self._volume_means(candles)
+            else:
+                volume_mean_12 = volume_mean_24 = np.mean(candles[-12:, 5])
             
-            if len(bb_upper) > 0 and len(bb_middle) > 0 and len(bb_lower) > 0:
-                current_bb_upper = bb_upper[-1]
-                current_bb_middle = bb_middle[-1]
-                current_bb_lower = bb_lower[-1]
-                bb_width = ((current_bb_upper - current_bb_lower) / current_bb_middle) if current_bb_middle != 0 else 0
-                
-                # Объем (скользящие средние)
-                volumes = self.candles[:, 5]  # volume
-                if len(volumes) >= 24:
-                    volume_mean_12 = np.mean(volumes[-12:])
-                    volume_mean_24 = np.mean(volumes[-24:-1]) if len(volumes) > 24 else volume_mean_12
-                    
-                    # Условие deadfish
-                    if (current_profit < self.sell_deadfish_profit and
-                        bb_width < self.sell_deadfish_bb_width and
-                        current_price > (current_bb_middle * self.sell_deadfish_bb_factor) and
-                        volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor)):
-                        # Закрываем позицию (deadfish)
-                        self.liquidate()
-                        return
+            # Условие deadfish
+            if (current_profit < self.sell_deadfish_profit and
+                bb_width < self.sell_deadfish_bb_width and
+                current_price > (current_bb_middle * self.sell_deadfish_bb_factor) and
+                volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor)):
+                # Закрываем позицию (deadfish)
+                self.liquidate()
+                return
         
         # === Кастомный стоп-лосс ===
         # Получаем текущую свечу для Stochastic
-        stoch_fast = ta.stochf(self.candles, fastk_period=5, fastd_period=3, sequential=True)
-        if isinstance(stoch_fast, tuple):
-            fastk = stoch_fast[0]  # k
-            if len(fastk) > 0:
-                current_fastk = fastk[-1]
-                
-                # Проверяем время удержания позиции (используем timestamp позиции)
-                if hasattr(self.position, 'opened_at') and self.position.opened_at:
-                    # Получаем текущее время в миллисекундах
-                    current_time = jh.now()
-                    entry_time = self.position.opened_at
-                    time_held_ms = current_time - entry_time
-                    
-                    # 60 минут = 60 * 60 * 1000 миллисекунд
-                    one_hour_ms = 60 * 60 * 1000
-                    # 1 день = 24 * 60 * 60 * 1000 миллисекунд
-                    one_day_ms = 24 * 60 * 60 * 1000
-                    
-                    # Если прошло больше 60 минут
-                    if time_held_ms > one_hour_ms:
-                        if current_fastk > self.sell_fastx and current_profit > -0.01:
-                            # Устанавливаем очень близкий стоп-лосс
-                            new_stop = entry_price * (1 - 0.001)
-                            if self.stop_loss is None or (isinstance(self.stop_loss, tuple) and self.stop_loss[1] < new_stop):
-                                self.stop_loss = qty, new_stop
-                    
-                    # Если прошло больше 1 дня
-                    if time_held_ms > one_day_ms:
-                        if current_fastk > self.sell_fastx and current_profit > -0.05:
-                            # Устанавливаем очень близкий стоп-лосс
-                            new_stop = entry_price * (1 - 0.001)
-                            if self.stop_loss is None or (isinstance(self.stop_loss, tuple) and self.stop_loss[1] < new_stop):
-                                self.stop_loss = qty, new_stop
-                
-                # Если вход был по тегу "ewo" и прибыль >= 5%
-                if self.vars['enter_tag'] == 'ewo' and current_profit >= 0.05:
-                    # Устанавливаем стоп-лосс на -0.5%
-                    new_stop = entry_price * (1 - 0.005)
-                    if self.stop_loss is None or (isinstance(self.stop_loss, tuple) and self.stop_loss[1] < new_stop):
+        current_fastk = ta.stochf(candles, fastk_period=5, fastd_period=3).k
+        
+        # Проверяем время удержания позиции (используем timestamp позиции)
+        if hasattr(self.position, 'opened_at') and self.position.opened_at:
+            # Получаем текущее время в миллисекундах
+            current_time = jh.now()
+            entry_time = self.position.opened_at
+            time_held_ms = current_time - entry_time
+            
+            # 60 минут = 60 * 60 * 1000 миллисекунд
+            one_hour_ms = 60 * 60 * 1000
+            # 1 день = 24 * 60 * 60 * 1000 миллисекунд
+            one_day_ms = 24 * 60 * 60 * 1000
+            
+            # Если прошло больше 60 минут
+            if time_held_ms > one_hour_ms:
+                if current_fastk > self.sell_fastx and current_profit > -0.01:
+                    # Устанавливаем очень близкий стоп-лосс
+                    new_stop = entry_price * (1 - 0.001)
+                    if self.stop_loss is None or new_stop > self.vars['current_stop']:
                         self.stop_loss = qty, new_stop
-                
-                # Если прибыль > 0 и fastk > sell_fastx
-                if current_profit > 0 and current_fastk > self.sell_fastx:
+                        self.vars['current_stop'] = new_stop
+            
+            # Если прошло больше 1 дня
+            if time_held_ms > one_day_ms:
+                if current_fastk > self.sell_fastx and current_profit > -0.05:
                     # Устанавливаем очень близкий стоп-лосс
                     new_stop = entry_price * (1 - 0.001)
-                    if self.stop_loss is None or (isinstance(self.stop_loss, tuple) and self.stop_loss[1] < new_stop):
+                    if self.stop_loss is None or new_stop > self.vars['current_stop']:
                         self.stop_loss = qty, new_stop
+                        self.vars['current_stop'] = new_stop
+        
+        # Если вход был по тегу "ewo" и прибыль >= 5%
+        if self.vars['enter_tag'] == 'ewo' and current_profit >= 0.05:
+            # Устанавливаем стоп-лосс на -0.5%
+            new_stop = entry_price * (1 - 0.005)
+            if self.stop_loss is None or new_stop > self.vars['current_stop']:
+                self.stop_loss = qty, new_stop
+                self.vars['current_stop'] = new_stop
+        
+        # Если прибыль > 0 и fastk > sell_fastx
+        if current_profit > 0 and current_fastk > self.sell_fastx:
+            # Устанавливаем очень близкий стоп-лосс
+            new_stop = entry_price * (1 - 0.001)
+            if self.stop_loss is None or new_stop > self.vars['current_stop']:
+                self.stop_loss = qty, new_stop
+                self.vars['current_stop'] = new_stop
     
     def should_cancel_entry(self) -> bool:
         return False
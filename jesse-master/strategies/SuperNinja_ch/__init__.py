@@ -1,65 +1,88 @@
-from jesse.strategies import Strategy
+from jesse.strategies import Strategy, StreamingIndicators, cached
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
+from numba import njit
 
 
-def bollinger_bands_ha(candles, window_size=40, num_of_std=2):
+def bollinger_bands_ha(candles, window_size=40, num_of_std=2, ha=None):
     """
     Bollinger Bands на Heikin Ashi Typical Price
+    ha — уже посчитанные heikin_ashi_candles(candles), чтобы не считать их повторно
     """
     if len(candles) < window_size:
         return np.array([]), np.array([])
     
     # Heikin Ashi
-    ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(candles)
+    ha_open, ha_high, ha_low, ha_close = ha if ha is not None else heikin_ashi_candles(candles)
     ha_typical = (ha_high + ha_low + ha_close) / 3
     
-    # Bollinger Bands
-    rolling_mean = np.full(len(candles), np.nan)
-    rolling_std = np.full(len(candles), np.nan)
+    # Bollinger Bands (значения до первого полного окна равны 0)
+    rolling_mean = np.zeros(len(candles))
+    lower_band = np.zeros(len(candles))
     
     for i in range(window_size - 1, len(candles)):
         window = ha_typical[i - window_size + 1:i + 1]
         rolling_mean[i] = np.mean(window)
-        rolling_std[i] = np.std(window)
-    
-    lower_band = rolling_mean - (rolling_std * num_of_std)
-    
-    # Заменяем NaN на 0
-    rolling_mean = np.nan_to_num(rolling_mean)
-    lower_band = np.nan_to_num(lower_band)
+        lower_band[i] = rolling_mean[i] - (np.std(window) * num_of_std)
     
     return rolling_mean, lower_band
 
 
-def heikin_ashi_candles(candles):
+@njit(cache=True)
+def _ha_extend(open_prices, high, low, close, start, ha_open, ha_high, ha_low, ha_close):
     """
-    Heikin Ashi Candles
+    Продолжает рекурренту Heikin Ashi с индекса start (start >= 1) до последней свечи
     """
-    ha_open = np.zeros(len(candles))
-    ha_close = np.zeros(len(candles))
-    ha_high = np.zeros(len(candles))
-    ha_low = np.zeros(len(candles))
-    
-    open_prices = candles[:, 1]
-    high = candles[:, 2]
-    low = candles[:, 3]
-    close = candles[:, 4]
+    for i in range(start, open_prices.shape[0]):
+        ha_close[i] = (open_prices[i] + high[i] + low[i] + close[i]) / 4
+        ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2
+        
+        # max/min из трех значений сравнениями, как builtin max/min
+        hi = high[i]
+        if ha_open[i] > hi:
+            hi = ha_open[i]
+        if ha_close[i] > hi:
+            hi = ha_close[i]
+        ha_high[i] = hi
+        
+        lo = low[i]
+        if ha_open[i] < lo:
+            lo = ha_open[i]
+        if ha_close[i] < lo:
+            lo = ha_close[i]
+        ha_low[i] = lo
+
+
+@njit(cache=True)
+def _ha_kernel(open_prices, high, low, close):
+    """
+    Рекуррента Heikin Ashi (ядро для heikin_ashi_candles)
+    """
+    n = open_prices.shape[0]
+    ha_open = np.zeros(n)
+    ha_close = np.zeros(n)
+    ha_high = np.zeros(n)
+    ha_low = np.zeros(n)
+    if n == 0:
+        return ha_open, ha_high, ha_low, ha_close
     
     ha_close[0] = (open_prices[0] + high[0] + low[0] + close[0]) / 4
     ha_open[0] = (open_prices[0] + close[0]) / 2
-    
-    for i in range(1, len(candles)):
-        ha_close[i] = (open_prices[i] + high[i] + low[i] + close[i]) / 4
-        ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2
-        ha_high[i] = max(high[i], ha_open[i], ha_close[i])
-        ha_low[i] = min(low[i], ha_open[i], ha_close[i])
+    _ha_extend(open_prices, high, low, close, 1, ha_open, ha_high, ha_low, ha_close)
     
     return ha_open, ha_high, ha_low, ha_close
 
 
-class SuperNinja_ch(Strategy):
+def heikin_ashi_candles(candles):
+    """
+    Heikin Ashi Candles
+    """
+    return _ha_kernel(candles[:, 1], candles[:, 2], candles[:, 3], candles[:, 4])
+
+
+class SuperNinja_ch(StreamingIndicators, Strategy):
     """
     SuperNinja_ch - Конвертированная стратегия ch (ClucHA) из Freqtrade
     Использует ClucHA условие входа с Heikin Ashi и Bollinger Bands
@@ -93,6 +116,35 @@ class SuperNinja_ch(Strategy):
         
         # Переменные
         self.vars['highest_price'] = 0
+        # Heikin Ashi для продолжения рекурренты: (число свечей, timestamp последней, буфер)
+        self.vars['ha_state'] = None
+    
+    @property
+    @cached
+    def _bar_heikin_ashi(self):
+        """
+        Heikin Ashi текущего бара — общие для свечного условия и BB на HA
+        Рекуррента продолжается только по свечам, добавленным с прошлого вызова:
+        буфер (4 x capacity) хранится в self.vars['ha_state']
+        """
+        candles = self._bar_candles
+        n = len(candles)
+        state = self.vars['ha_state']
+        if state is None or state[0] > n or candles[state[0] - 1, 0] != state[1]:
+            # Первый вызов или история свечей сдвинулась — считаем целиком
+            buffer = np.empty((4, 2 * n))
+            buffer[:, :n] = heikin_ashi_candles(candles)
+        else:
+            buffer = state[2]
+            if buffer.shape[1] < n:
+                grown = np.empty((4, 2 * n))
+                grown[:, :state[0]] = buffer[:, :state[0]]
+                buffer = grown
+            _ha_extend(candles[:, 1], candles[:, 2], candles[:, 3], candles[:, 4], state[0],
+                       buffer[0], buffer[1], buffer[2], buffer[3])
+        self.vars['ha_state'] = (n, candles[-1, 0], buffer)
+        # Дальше буфер только дописывается, поэтому срезы [:n] остаются валидными
+        return buffer[0, :n], buffer[1, :n], buffer[2, :n], buffer[3, :n]
     
     def should_long(self) -> bool:
         """
@@ -107,21 +159,36 @@ class SuperNinja_ch(Strategy):
         )
         """
         min_candles = max(200, 50, 40, 28, 168)  # Для всех индикаторов
-        if len(self.candles) < min_candles:
+        candles = self._bar_candles
+        if len(candles) < min_candles:
             return False
         
         current_price = self.close
         
+        # ROCR 1h (168 периодов) - упрощенная версия без информативного таймфрейма
+        # Используем ROCR на более длинном периоде как приближение
+        # Нужно только последнее значение, как у ta.rocr: close / close 168 свечей назад.
+        # Фильтр проверяется первым: он отсекает большинство баров, и тогда
+        # HA, BB и EMA можно не считать
+        current_rocr_1h = candles[-1, 2] / candles[-169, 2]
+        if not current_rocr_1h > self.clucha_rocr_1h:
+            return False
+        
         # Heikin Ashi
-        ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(self.candles)
+        ha = self._bar_heikin_ashi
+        ha_open, ha_high, ha_low, ha_close = ha
         if len(ha_close) < 2:
             return False
         
         current_ha_close = ha_close[-1]
         prev_ha_close = ha_close[-2]
         
-        # Bollinger Bands на HA Typical Price
-        bb_mid, bb_lower = bollinger_bands_ha(self.candles, 40, 2)
+        # Bollinger Bands на HA Typical Price: нужны два последних окна,
+        # а каждое окно считается независимо — хватает последних 41 свечей
+        tail_len = 40 + 1
+        bb_mid, bb_lower = bollinger_bands_ha(
+            candles[-tail_len:], 40, 2, ha=tuple(x[-tail_len:] for x in ha)
+        )
         if len(bb_mid) == 0 or len(bb_lower) == 0:
             return False
         
@@ -131,45 +198,29 @@ class SuperNinja_ch(Strategy):
         prev_bb_lower = bb_lower[-2]
         current_bb_lower = bb_lower[-1]
         
-        # BB delta
-        bbdelta = abs(bb_mid[-1] - bb_lower[-1])
+        # BB delta (нижняя полоса не выше средней — abs не нужен)
+        bbdelta = bb_mid[-1] - bb_lower[-1]
         
         # Closedelta (изменение ha_close)
         closedelta = abs(current_ha_close - prev_ha_close)
         
-        # Tail (разница между ha_close и ha_low)
-        tail = abs(current_ha_close - ha_low[-1])
+        # Tail (разница между ha_close и ha_low; ha_low <= ha_close по построению HA)
+        tail = current_ha_close - ha_low[-1]
         
         # EMA slow на ha_close
-        # Используем обычную EMA на close как приближение
-        ema_slow = ta.ema(self.candles, period=50, sequential=True)
-        if len(ema_slow) == 0:
-            return False
-        current_ema_slow = ema_slow[-1]
+        # Используем обычную EMA на close как приближение (потоково)
+        current_ema_slow = self._ema_last(candles, 50)
         
         # ROCR (28 периодов на ha_close)
         # Используем ROCR на close как приближение
-        rocr = ta.rocr(self.candles, period=28, source_type="close", sequential=True)
-        if len(rocr) == 0 or np.isnan(rocr[-1]):
-            return False
-        current_rocr = rocr[-1]
-        
-        # ROCR 1h (168 периодов) - упрощенная версия без информативного таймфрейма
-        # Используем ROCR на более длинном периоде как приближение
-        rocr_1h = ta.rocr(self.candles, period=168, source_type="close", sequential=True)
-        if len(rocr_1h) == 0 or np.isnan(rocr_1h[-1]):
+        current_rocr = candles[-1, 2] / candles[-29, 2]
+        if np.isnan(current_rocr):
             return False
-        current_rocr_1h = rocr_1h[-1]
         
         # Bollinger Bands обычные (для второго условия)
-        bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
-        if isinstance(bb, tuple) and len(bb) >= 3:
-            bb_lowerband2 = bb[2]  # lowerband
-            if len(bb_lowerband2) == 0:
-                return False
-            current_bb_lowerband2 = bb_lowerband2[-1]
-        else:
-            return False
+        # Нужно только последнее значение: без sequential индикатор считается
+        # по последним warmup_candles_num свечам, а не по всей истории
+        current_bb_lowerband2 = ta.bollinger_bands(candles, period=20, devup=2, devdn=2).lowerband
         
         # Условие 1: ClucHA основное
         condition1 = (
@@ -187,11 +238,8 @@ class SuperNinja_ch(Strategy):
             current_ha_close < (self.clucha_close_bblower * current_bb_lowerband2)
         )
         
-        # ROCR 1h фильтр
-        rocr_filter = current_rocr_1h > self.clucha_rocr_1h
-        
-        # Возвращаем True если rocr_1h фильтр пройден и одно из условий выполнено
-        if rocr_filter and (condition1 or condition2):
+        # Фильтр rocr_1h уже пройден — достаточно одного из условий
+        if condition1 or condition2:
             return True
         
         return False
@@ -203,8 +251,6 @@ class SuperNinja_ch(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи
@@ -226,6 +272,9 @@ class SuperNinja_ch(Strategy):
         
         # Инициализируем переменные
         self.vars['highest_price'] = entry_price
+        # Суммы объема пересчитываются целиком на первом баре позиции,
+        # чтобы ошибка округления не копилась между сделками
+        self.vars['volume_sums'] = None
     
     def go_short(self):
         pass
@@ -248,15 +297,11 @@ class SuperNinja_ch(Strategy):
         if current_price > self.vars['highest_price']:
             self.vars['highest_price'] = current_price
         
+        candles = self._bar_candles
+        
         # Получаем Stochastic Fast
-        stoch_fast = ta.stochf(self.candles, fastk_period=5, fastd_period=3, sequential=True)
-        if isinstance(stoch_fast, tuple):
-            fastk = stoch_fast[0]  # k
-            if len(fastk) == 0:
-                return
-            current_fastk = fastk[-1]
-        else:
-            return
+        # (нужно только последнее значение k — без sequential)
+        current_fastk = ta.stochf(candles, fastk_period=5, fastd_period=3).k
         
         # Проверяем время удержания позиции
         if hasattr(self.position, 'opened_at') and self.position.opened_at:
@@ -287,28 +332,24 @@ class SuperNinja_ch(Strategy):
                     return
         
         # === Deadfish Exit ===
-        bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
-        if isinstance(bb, tuple) and len(bb) >= 3:
-            bb_middle = bb[1]  # middleband
-            bb_upper = bb[0]   # upperband
-            bb_lower = bb[2]   # lowerband
+        # Нужны только последние значения (без sequential — по хвосту свечей)
+        bb_upper, bb_middle, bb_lower = ta.bollinger_bands(candles, period=20, devup=2, devdn=2)
+        bb_width = ((bb_upper - bb_lower) / bb_middle) if bb_middle != 0 else 0
+        
+        if len(candles) >= 24:
+            if len(candles) > 24:
+                volume_mean_12, volume_mean_24 = self._volume_means(candles)
+            else:
+                volume_mean_12 = volume_mean_24 = np.mean(candles[-12:, 5])
             
-            if len(bb_middle) > 0 and len(bb_upper) > 0 and len(bb_lower) > 0:
-                bb_width = ((bb_upper[-1] - bb_lower[-1]) / bb_middle[-1]) if bb_middle[-1] != 0 else 0
-                
-                volumes = self.candles[:, 5]
-                if len(volumes) >= 24:
-                    volume_mean_12 = np.mean(volumes[-12:])
-                    volume_mean_24 = np.mean(volumes[-24:-1]) if len(volumes) > 24 else volume_mean_12
-                    
-                    # Условие deadfish
-                    if (current_profit < self.sell_deadfish_profit and
-                        bb_width < self.sell_deadfish_bb_width and
-                        current_price > (bb_middle[-1] * self.sell_deadfish_bb_factor) and
-                        volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor)):
-                        # Закрываем позицию (deadfish)
-                        self.liquidate()
-                        return
+            # Условие deadfish
+            if (current_profit < self.sell_deadfish_profit and
+                bb_width < self.sell_deadfish_bb_width and
+                current_price > (bb_middle * self.sell_deadfish_bb_factor) and
+                volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor)):
+                # Закрываем позицию (deadfish)
+                self.liquidate()
+                return
     
     def should_cancel_entry(self) -> bool:
         return False
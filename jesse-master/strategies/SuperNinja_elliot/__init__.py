@@ -1,4 +1,5 @@
-from jesse.strategies import Strategy
+from jesse.strategies import Strategy, StreamingIndicators
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
@@ -17,10 +18,27 @@ def ewo(candles, ema_length=5, ema2_length=35):
     ema2 = ta.sma(candles, period=ema2_length, sequential=True)
     
     # Вычисляем разницу в процентах от цены закрытия
+    # (на месте, в буфере ema1 — без промежуточных массивов длины N)
     close_prices = candles[:, 4]  # close
-    emadif = ((ema1 - ema2) / close_prices) * 100
+    np.subtract(ema1, ema2, out=ema1)
+    ema1 /= close_prices
+    ema1 *= 100
     
-    return emadif
+    return ema1
+
+
+def ewo_last(candles, ema_length=5, ema2_length=35):
+    """
+    Последнее значение EWO — то же, что ewo(...)[-1], но обе SMA считаются
+    только по последним свечам, без массивов длины всей истории
+    Если свечей недостаточно, возвращает NaN
+    """
+    if len(candles) < ema2_length:
+        return np.nan
+    
+    sma1 = candles[-ema_length:, 2].mean()  # close
+    sma2 = candles[-ema2_length:, 2].mean()
+    return ((sma1 - sma2) / candles[-1, 4]) * 100
 
 
 def fisher_rsi(candles, period=14):
@@ -30,14 +48,14 @@ def fisher_rsi(candles, period=14):
     rsi = ta.rsi(candles, period=period, sequential=True)
     # Нормализуем RSI к диапазону [-1, 1]
     rsi_normalized = (rsi - 50) / 50 * 0.1
-    # Fisher Transform
-    fisher = (np.exp(2 * rsi_normalized) - 1) / (np.exp(2 * rsi_normalized) + 1)
+    # Fisher Transform: (e^2x - 1) / (e^2x + 1) == tanh(x), один проход вместо двух exp
+    fisher = np.tanh(rsi_normalized)
     # Нормализуем обратно к [0, 100]
     fisher_norma = 50 * (fisher + 1)
     return fisher_norma
 
 
-class SuperNinja_elliot(Strategy):
+class SuperNinja_elliot(StreamingIndicators, Strategy):
     """
     SuperNinja_elliot - Расширенная стратегия на основе ElliotV4
     Использует множество технических индикаторов для фильтрации сигналов:
@@ -102,24 +120,23 @@ class SuperNinja_elliot(Strategy):
         """
         # Минимальное количество свечей для всех индикаторов
         min_candles = max(self.slow_ewo, self.base_nb_candles_buy, 50, 200)
-        if len(self.candles) < min_candles:
+        candles = self._bar_candles
+        if len(candles) < min_candles:
             return False
         
         current_price = self.close
         
         # === Основные индикаторы ElliotV4 ===
-        # EMA для входа
-        ema_buy = ta.ema(self.candles, period=self.base_nb_candles_buy, sequential=True)
-        current_ema_buy = ema_buy[-1]
+        # EMA для входа (потоково, без пересчета всей истории)
+        current_ema_buy = self._ema_last(candles, self.base_nb_candles_buy)
         
         # EWO (Elliott Wave Oscillator)
-        ewo_values = ewo(self.candles, self.fast_ewo, self.slow_ewo)
-        if len(ewo_values) == 0:
+        current_ewo = ewo_last(candles, self.fast_ewo, self.slow_ewo)
+        if np.isnan(current_ewo):
             return False
-        current_ewo = ewo_values[-1]
         
         # RSI
-        rsi = ta.rsi(self.candles, period=14, sequential=True)
+        rsi = ta.rsi(candles, period=14, sequential=True)
         current_rsi = rsi[-1]
         
         # === Основные условия ElliotV4 ===
@@ -144,7 +161,7 @@ class SuperNinja_elliot(Strategy):
         # === Дополнительные фильтры (опционально) ===
         if self.use_adx_filter:
             # ADX для фильтрации слабых трендов
-            adx_values = ta.adx(self.candles, period=14, sequential=True)
+            adx_values = ta.adx(candles, period=14, sequential=True)
             if len(adx_values) > 0 and not np.isnan(adx_values[-1]):
                 current_adx = adx_values[-1]
                 if current_adx < self.adx_threshold:
@@ -154,7 +171,7 @@ class SuperNinja_elliot(Strategy):
         
         if self.use_macd_filter:
             # MACD для подтверждения тренда
-            macd_result = ta.macd(self.candles, fastperiod=12, slowperiod=26, signalperiod=9, sequential=True)
+            macd_result = ta.macd(candles, fastperiod=12, slowperiod=26, signalperiod=9, sequential=True)
             if isinstance(macd_result, tuple) and len(macd_result) >= 3:
                 macd_line = macd_result[0]
                 signal_line = macd_result[1]
@@ -164,7 +181,7 @@ class SuperNinja_elliot(Strategy):
         
         if self.use_bb_filter:
             # Bollinger Bands для фильтрации экстремальных цен
-            bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
+            bb = ta.bollinger_bands(candles, period=20, devup=2, devdn=2, sequential=True)
             if isinstance(bb, tuple) and len(bb) >= 3:
                 bb_lower = bb[2]  # lowerband
                 if len(bb_lower) > 0 and not np.isnan(bb_lower[-1]):
@@ -181,8 +198,6 @@ class SuperNinja_elliot(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи с учетом кредитного плеча
@@ -229,9 +244,9 @@ class SuperNinja_elliot(Strategy):
             self.vars['highest_price'] = current_price
         
         # Условие выхода: цена выше EMA * high_offset
-        if len(self.candles) >= self.base_nb_candles_sell:
-            ema_sell = ta.ema(self.candles, period=self.base_nb_candles_sell, sequential=True)
-            current_ema_sell = ema_sell[-1]
+        candles = self._bar_candles
+        if len(candles) >= self.base_nb_candles_sell:
+            current_ema_sell = self._ema_last(candles, self.base_nb_candles_sell)
             
             if current_price > (current_ema_sell * self.high_offset):
                 # Закрываем позицию
@@ -1,66 +1,11 @@
-from jesse.strategies import Strategy
+from jesse.strategies import Strategy, StreamingIndicators
+from jesse import utils
 import jesse.indicators as ta
 import jesse.helpers as jh
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import math
-
-
-def ewo_newstrategy4(candles, ema_length=5, ema2_length=35):
-    """
-    EWO (Elliott Wave Oscillator) для newstrategy4
-    Использует EMA и делит на close
-    """
-    if len(candles) < ema2_length:
-        return np.array([])
-    
-    ema1 = ta.ema(candles, period=ema_length, sequential=True)
-    ema2 = ta.ema(candles, period=ema2_length, sequential=True)
-    
-    close_prices = candles[:, 4]  # close
-    emadif = ((ema1 - ema2) / close_prices) * 100
-    
-    return emadif
-
-
-def ewo_fast(candles, ema_length=5, ema2_length=3):
-    """
-    EWO быстрый вариант
-    """
-    if len(candles) < ema2_length:
-        return np.array([])
-    
-    ema1 = ta.ema(candles, period=ema_length, sequential=True)
-    ema2 = ta.ema(candles, period=ema2_length, sequential=True)
-    
-    close_prices = candles[:, 4]  # close
-    emadif = ((ema1 - ema2) / close_prices) * 100
-    
-    return emadif
-
-
-def williams_r(candles, period=14):
-    """
-    Williams %R
-    """
-    if len(candles) < period:
-        return np.array([])
-    
-    high = candles[:, 2]  # high
-    low = candles[:, 3]   # low
-    close = candles[:, 4]  # close
-    
-    wr_values = np.full(len(candles), np.nan)
-    
-    for i in range(period - 1, len(candles)):
-        highest_high = np.max(high[i - period + 1:i + 1])
-        lowest_low = np.min(low[i - period + 1:i + 1])
-        
-        if highest_high != lowest_low:
-            wr_values[i] = ((highest_high - close[i]) / (highest_high - lowest_low)) * -100
-        else:
-            wr_values[i] = 0
-    
-    return wr_values
+from numba import njit
 
 
 def chaikin_money_flow(candles, period=20):
@@ -75,22 +20,24 @@ def chaikin_money_flow(candles, period=20):
     close = candles[:, 4]   # close
     volume = candles[:, 5]  # volume
     
+    # Money Flow Volume для всех свечей сразу; при нулевом диапазоне остается 0
+    hl_range = high - low
+    flat = hl_range == 0
     mfv = np.zeros(len(candles))
-    for i in range(len(candles)):
-        hl_range = high[i] - low[i]
-        if hl_range != 0:
-            mfv[i] = ((close[i] - low[i]) - (high[i] - close[i])) / hl_range * volume[i]
-        else:
-            mfv[i] = 0
+    np.divide((close - low) - (high - close), hl_range, out=mfv, where=~flat)
+    mfv *= volume
+    
+    # Суммы по окнам: каждое окно суммируется отдельно, как np.sum по срезу
+    # (накопленные суммы cumsum дали бы ошибку, растущую с длиной истории)
+    mfv_sum = sliding_window_view(mfv, window_shape=period).sum(axis=1)
+    volume_sum = sliding_window_view(volume, window_shape=period).sum(axis=1)
+    
+    zero_volume = volume_sum == 0
+    cmf_window = np.zeros(len(volume_sum))
+    np.divide(mfv_sum, volume_sum, out=cmf_window, where=~zero_volume)
     
     cmf_values = np.full(len(candles), np.nan)
-    for i in range(period - 1, len(candles)):
-        mfv_sum = np.sum(mfv[i - period + 1:i + 1])
-        volume_sum = np.sum(volume[i - period + 1:i + 1])
-        if volume_sum != 0:
-            cmf_values[i] = mfv_sum / volume_sum
-        else:
-            cmf_values[i] = 0
+    cmf_values[period - 1:] = cmf_window
     
     return cmf_values
 
@@ -106,51 +53,102 @@ def top_percent_change_dca(candles, length=0):
         return (open_prices - close_prices) / close_prices
     else:
         result = np.full(len(candles), np.nan)
-        for i in range(length - 1, len(candles)):
-            max_open = np.max(open_prices[i - length + 1:i + 1])
-            result[i] = (max_open - close_prices[i]) / close_prices[i]
+        if len(candles) >= length:
+            # Максимум open по всем окнам сразу
+            max_open = sliding_window_view(open_prices, window_shape=length).max(axis=1)
+            close_tail = close_prices[length - 1:]
+            result[length - 1:] = (max_open - close_tail) / close_tail
         return result
 
 
-def heikin_ashi_candles(candles):
+@njit(cache=True)
+def _ha_kernel(open_prices, high, low, close):
     """
-    Heikin Ashi Candles
+    Рекуррента Heikin Ashi (ядро для heikin_ashi_candles)
     """
-    ha_open = np.zeros(len(candles))
-    ha_close = np.zeros(len(candles))
-    ha_high = np.zeros(len(candles))
-    ha_low = np.zeros(len(candles))
-    
-    open_prices = candles[:, 1]
-    high = candles[:, 2]
-    low = candles[:, 3]
-    close = candles[:, 4]
+    n = open_prices.shape[0]
+    # Все элементы записываются ниже — без предварительного заполнения нулями
+    ha_open = np.empty(n)
+    ha_close = np.empty(n)
+    ha_high = np.empty(n)
+    ha_low = np.empty(n)
+    if n == 0:
+        return ha_open, ha_high, ha_low, ha_close
     
     ha_close[0] = (open_prices[0] + high[0] + low[0] + close[0]) / 4
     ha_open[0] = (open_prices[0] + close[0]) / 2
+    # High/low первой свечи, как и раньше, равны 0
+    ha_high[0] = 0.0
+    ha_low[0] = 0.0
     
-    for i in range(1, len(candles)):
+    for i in range(1, n):
         ha_close[i] = (open_prices[i] + high[i] + low[i] + close[i]) / 4
         ha_open[i] = (ha_open[i-1] + ha_close[i-1]) / 2
-        ha_high[i] = max(high[i], ha_open[i], ha_close[i])
-        ha_low[i] = min(low[i], ha_open[i], ha_close[i])
+        
+        # max/min из трех значений сравнениями, как builtin max/min
+        hi = high[i]
+        if ha_open[i] > hi:
+            hi = ha_open[i]
+        if ha_close[i] > hi:
+            hi = ha_close[i]
+        ha_high[i] = hi
+        
+        lo = low[i]
+        if ha_open[i] < lo:
+            lo = ha_open[i]
+        if ha_close[i] < lo:
+            lo = ha_close[i]
+        ha_low[i] = lo
     
     return ha_open, ha_high, ha_low, ha_close
 
 
-def ha_typical_price(ha_high, ha_low, ha_close):
+def heikin_ashi_candles(candles):
     """
-    Heikin Ashi Typical Price
+    Heikin Ashi Candles
     """
-    return (ha_high + ha_low + ha_close) / 3
+    return _ha_kernel(candles[:, 1], candles[:, 2], candles[:, 3], candles[:, 4])
 
 
-def rmi(candles, length=14, mom=4):
+@njit(cache=True)
+def _cti_loop(close, period):
     """
-    RMI (Relative Momentum Index) - упрощенная версия
-    Используем RSI как приближение
+    Скользящая корреляция Пирсона между ценой и временем (ядро для _calculate_cti)
     """
-    return ta.rsi(candles, period=length, sequential=True)
+    n = close.shape[0]
+    cti_values = np.full(n, np.nan)
+    
+    # Время в окне — это просто индексы 0..period-1, поэтому центрированное
+    # время и сумма его квадратов одинаковы для всех окон
+    mean_time = (period - 1) / 2.0
+    sum_t2 = 0.0
+    for j in range(period):
+        sum_t2 += (j - mean_time) * (j - mean_time)
+    
+    for i in range(period - 1, n):
+        start = i - period + 1
+        
+        sum_c = 0.0
+        for j in range(period):
+            sum_c += close[start + j]
+        mean_close = sum_c / period
+        
+        # Центрируем каждое окно заново: скользящие суммы квадратов на уровне
+        # цен ~1e5 теряют точность из-за вычитания близких чисел
+        numerator = 0.0
+        sum_c2 = 0.0
+        for j in range(period):
+            dc = close[start + j] - mean_close
+            numerator += dc * (j - mean_time)
+            sum_c2 += dc * dc
+        
+        denominator = np.sqrt(sum_c2 * sum_t2)
+        if denominator != 0:
+            cti_values[i] = numerator / denominator
+        else:
+            cti_values[i] = 0
+    
+    return cti_values
 
 
 def vwap_bands(candles, window_size=20, num_of_std=1):
@@ -166,17 +164,23 @@ def vwap_bands(candles, window_size=20, num_of_std=1):
     volume = candles[:, 5]
     
     typical_price = (high + low + close) / 3
-    vwap = np.full(len(candles), np.nan)
     
-    for i in range(window_size - 1, len(candles)):
-        tp_vol_sum = np.sum(typical_price[i - window_size + 1:i + 1] * volume[i - window_size + 1:i + 1])
-        vol_sum = np.sum(volume[i - window_size + 1:i + 1])
-        if vol_sum != 0:
-            vwap[i] = tp_vol_sum / vol_sum
+    # Суммы по окнам: каждое окно суммируется отдельно, как np.sum по срезу
+    tp_vol_sum = sliding_window_view(typical_price * volume, window_shape=window_size).sum(axis=1)
+    vol_sum = sliding_window_view(volume, window_shape=window_size).sum(axis=1)
+    
+    vwap = np.full(len(candles), np.nan)
+    # (там, где объем окна нулевой, остается NaN)
+    np.divide(tp_vol_sum, vol_sum, out=vwap[window_size - 1:], where=vol_sum != 0)
     
-    # Rolling std
+    # Rolling std: окна без NaN считаются все сразу
     rolling_std = np.full(len(candles), np.nan)
-    for i in range(window_size - 1, len(candles)):
+    windows = sliding_window_view(vwap, window_shape=window_size)
+    complete = ~np.isnan(windows).any(axis=1)
+    rolling_std[window_size - 1:][complete] = windows[complete].std(axis=1)
+    
+    # Окна с NaN (начало ряда и окна с нулевым объемом) — по непустым значениям
+    for i in np.flatnonzero(~complete) + (window_size - 1):
         vwap_window = vwap[i - window_size + 1:i + 1]
         vwap_window = vwap_window[~np.isnan(vwap_window)]
         if len(vwap_window) > 0:
@@ -188,7 +192,7 @@ def vwap_bands(candles, window_size=20, num_of_std=1):
     return vwap_low, vwap, vwap_high
 
 
-class SuperNinja_newstrategy4(Strategy):
+class SuperNinja_newstrategy4(StreamingIndicators, Strategy):
     """
     SuperNinja_newstrategy4 - Конвертированная стратегия newstrategy4 из Freqtrade
     Очень сложная стратегия с множеством условий входа, DCA и кастомным стоп-лоссом
@@ -271,6 +275,11 @@ class SuperNinja_newstrategy4(Strategy):
         self.max_safety_orders = 8
         self.safety_order_step_scale = 1.2
         self.safety_order_volume_scale = 1.4
+        # Степени масштабов для номеров ордеров 0..max_safety_orders - 1 (считаются один раз)
+        self.safety_order_step_powers = [math.pow(self.safety_order_step_scale, i)
+                                         for i in range(self.max_safety_orders)]
+        self.safety_order_volume_powers = [math.pow(self.safety_order_volume_scale, i)
+                                           for i in range(self.max_safety_orders)]
         
         # Стоп-лосс
         self.stop_loss_pct = 0.99  # -99%
@@ -280,82 +289,46 @@ class SuperNinja_newstrategy4(Strategy):
         self.vars['highest_price'] = 0
         self.vars['buy_count'] = 0
         self.vars['initial_stake'] = 0
+        # Цена текущего стоп-лосса (без разбора self.stop_loss)
+        self.vars['current_stop'] = 0
     
     def should_long(self) -> bool:
         """
         Множество условий входа (упрощенная версия основных)
         """
         min_candles = max(200, 50, 20, 84, 112)
-        if len(self.candles) < min_candles:
+        candles = self._bar_candles
+        if len(candles) < min_candles:
             return False
         
         current_price = self.close
         
         # === Основные индикаторы ===
-        ema_16 = ta.ema(self.candles, period=16, sequential=True)
-        ema_26 = ta.ema(self.candles, period=26, sequential=True)
-        ema_12 = ta.ema(self.candles, period=12, sequential=True)
-        ema_50 = ta.ema(self.candles, period=50, sequential=True)
-        ema_200 = ta.ema(self.candles, period=200, sequential=True)
-        rsi = ta.rsi(self.candles, period=14, sequential=True)
-        rsi_fast = ta.rsi(self.candles, period=4, sequential=True)
-        rsi_slow = ta.rsi(self.candles, period=20, sequential=True)
-        rsi_84 = ta.rsi(self.candles, period=84, sequential=True)
-        rsi_112 = ta.rsi(self.candles, period=112, sequential=True)
-        
-        ewo_values = ewo_newstrategy4(self.candles, self.fast_ewo, self.slow_ewo)
-        ewo_fast_values = ewo_fast(self.candles, 50, 200)
-        cti_values = self._calculate_cti(self.candles, 20)
-        
-        if len(ewo_values) == 0 or len(cti_values) == 0:
-            return False
+        # Нужны только последние значения: EMA считаются потоково
+        current_ema_16 = self._ema_last(candles, 16)
+        current_ema_26 = self._ema_last(candles, 26)
+        current_ema_12 = self._ema_last(candles, 12)
+        current_ema_50 = self._ema_last(candles, 50)
+        current_ema_200 = self._ema_last(candles, 200)
         
-        current_ema_16 = ema_16[-1]
-        current_ema_26 = ema_26[-1]
-        current_ema_12 = ema_12[-1]
-        current_ema_50 = ema_50[-1]
-        current_ema_200 = ema_200[-1]
-        current_rsi = rsi[-1]
-        current_rsi_fast = rsi_fast[-1]
-        current_rsi_slow = rsi_slow[-1]
-        current_ewo = ewo_values[-1]
-        current_ewo_fast = ewo_fast_values[-1] if len(ewo_fast_values) > 0 else 0
-        current_cti = cti_values[-1]
-        
-        # Bollinger Bands
-        bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
-        if isinstance(bb, tuple) and len(bb) >= 3:
-            bb_lower = bb[2]
-            bb_middle = bb[1]
-            bb_upper = bb[0]
-            bb_width = ((bb_upper[-1] - bb_lower[-1]) / bb_middle[-1]) if bb_middle[-1] != 0 else 0
-        else:
-            return False
+        # EWO: (EMA fast - EMA slow) / close * 100 из тех же потоковых EMA
+        current_ewo = ((self._ema_last(candles, self.fast_ewo) -
+                        self._ema_last(candles, self.slow_ewo)) / candles[-1, 4]) * 100
+        current_ewo_fast = ((current_ema_50 - current_ema_200) / candles[-1, 4]) * 100
         
-        # Heikin Ashi
-        ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(self.candles)
-        current_ha_close = ha_close[-1]
-        prev_ha_close = ha_close[-2] if len(ha_close) > 1 else current_ha_close
+        # CTI — только по последнему окну
+        current_cti = self._calculate_cti(candles[-20:], 20)[-1]
         
-        # VWAP
-        vwap_low, vwap, vwap_high = vwap_bands(self.candles, 20, 1)
-        if len(vwap_low) == 0:
-            return False
-        current_vwap_low = vwap_low[-1]
-        
-        # Top percent change
-        tpct_change_0 = top_percent_change_dca(self.candles, 0)
-        tcp_percent_4 = top_percent_change_dca(self.candles, 4)
-        if len(tpct_change_0) == 0 or len(tcp_percent_4) == 0:
-            return False
-        current_tpct_0 = tpct_change_0[-1]
-        current_tcp_4 = tcp_percent_4[-1]
+        current_open = self.open
         
-        # Williams %R
-        r_14 = williams_r(self.candles, 14)
-        if len(r_14) == 0:
+        # Все условия, кроме local_uptrend, требуют CTI ниже порога (самый мягкий — -0.7),
+        # а local_uptrend — разрыв EMA 26/12 больше open * 0.025:
+        # если не выполнено ни то, ни другое, RSI, BB и VWAP можно не считать
+        cti_ok = current_cti < max(self.buy_44_cti, self.buy_37_cti, self.buy_cti_7, -0.8, -0.9)
+        uptrend_ok = (current_ema_26 > current_ema_12 and
+                      (current_ema_26 - current_ema_12) > (current_open * 0.025))
+        if not (cti_ok or uptrend_ok):
             return False
-        current_r_14 = r_14[-1]
         
         # === Условия входа (основные) ===
         
@@ -366,6 +339,10 @@ class SuperNinja_newstrategy4(Strategy):
             self.vars['enter_tag'] = 'NFINext44'
             return True
         
+        # RSI нужен только условиям NFINext37 и VWAP, а они требуют cti_ok
+        # (NaN делает оба условия ложными, как и CTI выше порога)
+        current_rsi = ta.rsi(candles, period=14, sequential=True)[-1] if cti_ok else np.nan
+        
         # NFINext37
         if (current_ewo > self.buy_37_ewo and
             current_rsi < self.buy_37_rsi and
@@ -374,29 +351,32 @@ class SuperNinja_newstrategy4(Strategy):
             return True
         
         # NFINext7
-        current_open = self.open
         if (current_ema_26 > current_ema_12 and
             (current_ema_26 - current_ema_12) > (current_open * self.buy_ema_open_mult_7) and
             current_cti < self.buy_cti_7):
             self.vars['enter_tag'] = 'NFINext7'
             return True
         
-        # VWAP
-        if (current_price < current_vwap_low and
-            current_tcp_4 > 0.053 and
-            current_cti < -0.8 and
-            current_rsi < 35 and
-            rsi_84[-1] < 60 and
-            rsi_112[-1] < 60):
-            self.vars['enter_tag'] = 'vwap'
-            return True
+        # VWAP: полосы VWAP и длинные RSI считаются, только если CTI и RSI уже подходят
+        if current_cti < -0.8 and current_rsi < 35:
+            # Последнее значение VWAP зависит от 2 * 20 - 1 последних свечей
+            vwap_low, vwap, vwap_high = vwap_bands(candles[-39:], 20, 1)
+            current_tcp_4 = top_percent_change_dca(candles[-4:], 4)[-1]
+            if (current_price < vwap_low[-1] and
+                current_tcp_4 > 0.053 and
+                ta.rsi(candles, period=84, sequential=True)[-1] < 60 and
+                ta.rsi(candles, period=112, sequential=True)[-1] < 60):
+                self.vars['enter_tag'] = 'vwap'
+                return True
         
         # Local uptrend
-        if (current_ema_26 > current_ema_12 and
-            (current_ema_26 - current_ema_12) > (current_open * 0.025) and
-            current_price < (bb_lower[-1] * self.buy_bb_factor)):
-            self.vars['enter_tag'] = 'local_uptrend'
-            return True
+        if uptrend_ok:
+            # Нужно только последнее значение: без sequential индикатор считается
+            # по последним warmup_candles_num свечам, а не по всей истории
+            bb_lower = ta.bollinger_bands(candles, period=20, devup=2, devdn=2).lowerband
+            if current_price < (bb_lower * self.buy_bb_factor):
+                self.vars['enter_tag'] = 'local_uptrend'
+                return True
         
         # NFIX29
         if (current_price < (current_ema_16 * 0.982) and
@@ -414,8 +394,6 @@ class SuperNinja_newstrategy4(Strategy):
         """
         Вход в лонг позицию
         """
-        from jesse import utils
-        
         entry_price = self.price
         
         # Используем 95% доступной маржи
@@ -434,11 +412,13 @@ class SuperNinja_newstrategy4(Strategy):
         # Стоп-лосс -99%
         stop_loss_price = entry_price * (1 - self.stop_loss_pct)
         self.stop_loss = qty, stop_loss_price
+        self.vars['current_stop'] = stop_loss_price
         
         # Инициализируем переменные
         self.vars['highest_price'] = entry_price
         self.vars['buy_count'] = 1
         self.vars['initial_stake'] = position_size
+        self.vars['volume_sums'] = None
     
     def go_short(self):
         pass
@@ -463,30 +443,32 @@ class SuperNinja_newstrategy4(Strategy):
         if current_price > self.vars['highest_price']:
             self.vars['highest_price'] = current_price
         
+        candles = self._bar_candles
+        
         # === Deadfish Exit ===
-        bb = ta.bollinger_bands(self.candles, period=20, devup=2, devdn=2, sequential=True)
-        if isinstance(bb, tuple) and len(bb) >= 3:
-            bb_middle = bb[1]
-            bb_width = ((bb[0][-1] - bb[2][-1]) / bb_middle[-1]) if bb_middle[-1] != 0 else 0
+        # Нужны только последние значения (без sequential — по хвосту свечей)
+        bb_upper, bb_middle, bb_lower = ta.bollinger_bands(candles, period=20, devup=2, devdn=2)
+        bb_width = ((bb_upper - bb_lower) / bb_middle) if bb_middle != 0 else 0
+        
+        if len(candles) >= 24:
+            if len(candles) > 24:
+                volume_mean_12, volume_mean_24 = self._volume_means(candles)
+            else:
+                volume_mean_12 = volume_mean_24 = np.mean(candles[-12:, 5])
             
-            volumes = self.candles[:, 5]
-            if len(volumes) >= 24:
-                volume_mean_12 = np.mean(volumes[-12:])
-                volume_mean_24 = np.mean(volumes[-24:-1]) if len(volumes) > 24 else volume_mean_12
-                
-                ema_200 = ta.ema(self.candles, period=200, sequential=True)
-                cmf = chaikin_money_flow(self.candles, 20)
-                
-                if (len(ema_200) > 0 and len(cmf) > 0 and
-                    current_profit < self.sell_deadfish_profit and
-                    current_price < ema_200[-1] and
-                    bb_width < self.sell_deadfish_bb_width and
-                    current_price > (bb_middle[-1] * self.sell_deadfish_bb_factor) and
-                    volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor) and
-                    cmf[-1] < 0.0):
-                    # Закрываем позицию (deadfish)
-                    self.liquidate()
-                    return
+            current_ema_200 = self._ema_last(candles, 200)
+            cmf = chaikin_money_flow(candles, 20)
+            
+            if (len(cmf) > 0 and
+                current_profit < self.sell_deadfish_profit and
+                current_price < current_ema_200 and
+                bb_width < self.sell_deadfish_bb_width and
+                current_price > (bb_middle * self.sell_deadfish_bb_factor) and
+                volume_mean_12 < (volume_mean_24 * self.sell_deadfish_volume_factor) and
+                cmf[-1] < 0.0):
+                # Закрываем позицию (deadfish)
+                self.liquidate()
+                return
         
         # === Кастомный стоп-лосс ===
         HSL = self.pHSL
@@ -504,8 +486,9 @@ class SuperNinja_newstrategy4(Strategy):
         
         if sl_profit < current_profit:
             new_stop = entry_price * (1 + sl_profit)
-            if self.stop_loss is None or (isinstance(self.stop_loss, tuple) and self.stop_loss[1] < new_stop):
+            if self.stop_loss is None or new_stop > self.vars['current_stop']:
                 self.stop_loss = qty, new_stop
+                self.vars['current_stop'] = new_stop
         
         # === DCA (Dollar Cost Averaging) ===
         if (current_profit <= self.initial_safety_order_trigger and
@@ -516,13 +499,12 @@ class SuperNinja_newstrategy4(Strategy):
             if self.safety_order_step_scale > 1:
                 safety_order_trigger = (abs(self.initial_safety_order_trigger) +
                     abs(self.initial_safety_order_trigger) * self.safety_order_step_scale *
-                    (math.pow(self.safety_order_step_scale, (self.vars['buy_count'] - 1)) - 1) /
+                    (self.safety_order_step_powers[self.vars['buy_count'] - 1] - 1) /
                     (self.safety_order_step_scale - 1))
             
             if current_profit <= (-1 * abs(safety_order_trigger)):
                 # Вычисляем размер следующего ордера
-                from jesse import utils
-                stake_amount = self.vars['initial_stake'] * math.pow(self.safety_order_volume_scale, (self.vars['buy_count'] - 1))
+                stake_amount = self.vars['initial_stake'] * self.safety_order_volume_powers[self.vars['buy_count'] - 1]
                 add_qty = utils.size_to_qty(stake_amount, current_price, precision=8)
                 
                 if add_qty > 0:
@@ -531,24 +513,27 @@ class SuperNinja_newstrategy4(Strategy):
                     self.vars['buy_count'] += 1
         
         # === Выход по условиям ===
-        ema_sell = ta.ema(self.candles, period=self.base_nb_candles_sell, sequential=True)
+        ema_sell = ta.ema(candles, period=self.base_nb_candles_sell, sequential=True)
         if len(ema_sell) > 0:
             current_ema_sell = ema_sell[-1]
             
             # Fisher для выхода
-            rsi = ta.rsi(self.candles, period=14, sequential=True)
+            rsi = ta.rsi(candles, period=14, sequential=True)
             if len(rsi) > 0:
                 rsi_normalized = (rsi[-1] - 50) / 50 * 0.1
-                fisher = (np.exp(2 * rsi_normalized) - 1) / (np.exp(2 * rsi_normalized) + 1)
+                # (e^2x - 1) / (e^2x + 1) == tanh(x); x — скаляр, поэтому math, а не numpy
+                fisher = math.tanh(rsi_normalized)
                 
-                ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(self.candles)
-                if len(ha_high) >= 3 and len(ha_close) >= 2:
+                # Heikin Ashi нужны, только если Fisher выше порога
+                # (при 0.1 * (rsi - 50) / 50 это |fisher| <= tanh(0.1) ~ 0.0997)
+                if fisher > self.sell_fisher:
+                    ha_open, ha_high, ha_low, ha_close = heikin_ashi_candles(candles)
                     # Условие выхода по Fisher
-                    if (fisher > self.sell_fisher and
+                    if (len(ha_high) >= 3 and len(ha_close) >= 2 and
                         ha_high[-1] <= ha_high[-2] and
                         ha_high[-2] <= ha_high[-3] and
                         ha_close[-1] <= ha_close[-2] and
-                        current_price > (bb_middle[-1] * self.sell_bbmiddle_close)):
+                        current_price > (bb_middle * self.sell_bbmiddle_close)):
                         self.liquidate()
                         return
             
@@ -565,30 +550,8 @@ class SuperNinja_newstrategy4(Strategy):
             return np.array([])
         
         close_prices = candles[:, 4]
-        time_array = np.arange(len(close_prices))
-        
-        cti_values = np.full(len(close_prices), np.nan)
-        
-        for i in range(period - 1, len(close_prices)):
-            window_close = close_prices[i - period + 1:i + 1]
-            window_time = time_array[i - period + 1:i + 1]
-            
-            if len(window_close) == period:
-                mean_close = np.mean(window_close)
-                mean_time = np.mean(window_time)
-                
-                numerator = np.sum((window_close - mean_close) * (window_time - mean_time))
-                denominator = np.sqrt(
-                    np.sum((window_close - mean_close) ** 2) *
-                    np.sum((window_time - mean_time) ** 2)
-                )
-                
-                if denominator != 0:
-                    cti_values[i] = numerator / denominator
-                else:
-                    cti_values[i] = 0
         
-        return cti_values
+        return _cti_loop(close_prices, period)
     
     def should_cancel_entry(self) -> bool:
         return False
@@ -29,10 +29,22 @@ from freqtrade.strategy import (
     stoploss_from_open,
 )
 
-import talib.abstract as ta
+import talib
 from technical import qtpylib
 
 
+def _pct_change(values: np.ndarray, periods: int) -> np.ndarray:
+    """
+    То же, что Series.pct_change(periods) (values / values.shift(periods) - 1),
+    но одним делением по срезам массива, без промежуточных Series
+    """
+    out = np.full(len(values), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(values[periods:], values[:-periods], out=out[periods:])
+    out[periods:] -= 1
+    return out
+
+
 class AdvancedIndicatorStrategy(IStrategy):
     """
     Продвинутая стратегия с множеством технических индикаторов
@@ -66,6 +78,12 @@ class AdvancedIndicatorStrategy(IStrategy):
     
     startup_candle_count: int = 100
     
+    def __init__(self, config: dict) -> None:
+        super().__init__(config)
+        # Последние (open, close) информативных таймфреймов по парам:
+        # pair -> {timeframe: (open, close)}
+        self._informative_trends = {}
+    
     def informative_pairs(self):
         """
         Добавляем дополнительные таймфреймы для трендов
@@ -80,46 +98,67 @@ class AdvancedIndicatorStrategy(IStrategy):
         """
         Заполняем все необходимые индикаторы
         """
+        # talib принимает только float64 и копирует несмежный массив при каждом вызове,
+        # поэтому колонки, которые в него передаются, приводятся один раз
+        for col in ('high', 'low', 'close', 'volume'):
+            values = dataframe[col].to_numpy()
+            if values.dtype != np.float64 or not values.flags['C_CONTIGUOUS']:
+                dataframe[col] = np.ascontiguousarray(values, dtype=np.float64)
+        
+        # Колонки OHLCV извлекаются один раз и передаются в функции talib напрямую:
+        # talib.abstract разбирает DataFrame заново при каждом вызове
+        high = dataframe['high'].to_numpy()
+        low = dataframe['low'].to_numpy()
+        close = dataframe['close'].to_numpy()
+        volume = dataframe['volume'].to_numpy()
+        
         # === RSI индикаторы ===
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        dataframe['rsi_fast'] = ta.RSI(dataframe, timeperiod=7)
+        dataframe['rsi'] = talib.RSI(close, timeperiod=14)
+        dataframe['rsi_fast'] = talib.RSI(close, timeperiod=7)
         
         # RSI RMI (Relative Momentum Index)
         rmi_length = 14
         dataframe['rsi_rmi_length'] = dataframe['rsi']
-        dataframe['rsi_mfi_rmi_length'] = ta.MFI(dataframe, timeperiod=14)
+        dataframe['rsi_mfi_rmi_length'] = talib.MFI(high, low, close, volume, timeperiod=14)
         
-        # FastK RSI
-        dataframe['fastk_rsi'] = ta.STOCHF(dataframe, fastk_period=5, fastd_period=3)['fastk']
+        # FastK RSI (STOCHF возвращает (fastk, fastd))
+        dataframe['fastk_rsi'] = talib.STOCHF(high, low, close, fastk_period=5, fastd_period=3)[0]
         
         # === Moving Averages ===
-        dataframe['ema_5'] = ta.EMA(dataframe, timeperiod=5)
-        dataframe['zema_30'] = ta.EMA(dataframe, timeperiod=30)  # ZEMA как EMA
-        dataframe['basis_ma_period_rsi_period'] = ta.SMA(dataframe, timeperiod=20)
+        dataframe['ema_5'] = talib.EMA(close, timeperiod=5)
+        dataframe['zema_30'] = talib.EMA(close, timeperiod=30)  # ZEMA как EMA
+        dataframe['basis_ma_period_rsi_period'] = talib.SMA(close, timeperiod=20)
         
         # KAMA (Kaufman Adaptive Moving Average)
-        dataframe['high_offset_kama'] = ta.KAMA(dataframe, timeperiod=14)
+        dataframe['high_offset_kama'] = talib.KAMA(close, timeperiod=14)
         
         # === VWAP ===
         dataframe['vwap_high'] = qtpylib.rolling_vwap(dataframe)  # Используем rolling_vwap для избежания lookahead bias
         
         # === Donchian Channels ===
         period = 20
-        dataframe['dc_mid'] = (dataframe['high'].rolling(period).max() + dataframe['low'].rolling(period).min()) / 2
-        dataframe['dc_upper'] = dataframe['high'].rolling(period).max()
-        dataframe['dc_lower'] = dataframe['low'].rolling(period).min()
-        dataframe['dc_lf'] = dataframe['dc_lower']  # Lower filter
-        dataframe['dca_buy_signal2'] = (dataframe['close'] > dataframe['dc_lower']).astype(int)
+        # Каждый канал считается одним проходом rolling и переиспользуется для dc_mid
+        dc_upper = dataframe['high'].rolling(period).max()
+        dc_lower = dataframe['low'].rolling(period).min()
+        dataframe['dc_mid'] = (dc_upper + dc_lower) / 2
+        dataframe['dc_upper'] = dc_upper
+        dataframe['dc_lower'] = dc_lower
+        dataframe['dc_lf'] = dc_lower  # Lower filter
+        dataframe['dca_buy_signal2'] = (dataframe['close'] > dataframe['dc_lower']).astype(np.uint8)
         
         # === Bollinger Bands ===
         bb_period = 20
         bb_std = 2
-        bollinger = qtpylib.bollinger_bands(dataframe['close'], window=bb_period, stds=bb_std)
-        dataframe['bb_lowerband'] = bollinger['lower']
-        dataframe['bb_lowerband2'] = bollinger['lower'] * 0.99
-        dataframe['bb_lowerband3'] = bollinger['lower'] * 0.98
-        dataframe['bb_up'] = bollinger['upper']
-        dataframe['bb_mid'] = bollinger['mid']
+        # Среднее и std окна считаются один раз (как в qtpylib.bollinger_bands,
+        # с min_periods=1) и переиспользуются ниже для Dispersion
+        bb_mid = dataframe['close'].rolling(bb_period, min_periods=1).mean()
+        bb_stdev = dataframe['close'].rolling(bb_period, min_periods=1).std()
+        bb_lower = bb_mid - bb_stdev * bb_std
+        dataframe['bb_lowerband'] = bb_lower
+        dataframe['bb_lowerband2'] = bb_lower * 0.99
+        dataframe['bb_lowerband3'] = bb_lower * 0.98
+        dataframe['bb_up'] = bb_mid + bb_stdev * bb_std
+        dataframe['bb_mid'] = bb_mid
         
         # === Ichimoku ===
         # Вычисляем компоненты Ichimoku вручную
@@ -149,102 +188,99 @@ class AdvancedIndicatorStrategy(IStrategy):
         
         # === Volume indicators ===
         dataframe['avg_vol'] = dataframe['volume'].rolling(20).mean()
-        dataframe['low_vol'] = (dataframe['volume'] < dataframe['avg_vol'] * 0.5).astype(int)
+        dataframe['low_vol'] = (dataframe['volume'] < dataframe['avg_vol'] * 0.5).astype(np.uint8)
         dataframe['avg_rsi'] = dataframe['rsi'].rolling(14).mean()
         
         # === Momentum indicators ===
-        dataframe['close_delta'] = dataframe['close'].diff()
-        dataframe['closedelta'] = dataframe['close'].diff()
-        dataframe['down_rmi_length'] = -dataframe['close'].pct_change(14)
-        dataframe['negative_pmom_nmom_prev'] = -dataframe['close'].pct_change(1)
-        dataframe['ema_5_pmom_nmom'] = dataframe['ema_5'].pct_change(1)
+        # Разность close считается один раз для обеих колонок
+        close_delta = np.full(len(close), np.nan)
+        np.subtract(close[1:], close[:-1], out=close_delta[1:])
+        dataframe['close_delta'] = close_delta
+        dataframe['closedelta'] = close_delta
+        dataframe['down_rmi_length'] = -_pct_change(close, 14)
+        dataframe['negative_pmom_nmom_prev'] = -_pct_change(close, 1)
+        dataframe['ema_5_pmom_nmom'] = _pct_change(dataframe['ema_5'].to_numpy(), 1)
         
         # === Dispersion ===
-        ma_period = 20
+        ma_period = bb_period
         rsi_period = 14
         stdev_multiplier = 2.0
-        dataframe['basis'] = dataframe['close'].rolling(ma_period).mean()
-        dataframe['stdev'] = dataframe['close'].rolling(ma_period).std()
+        # Те же окна, что и у Bollinger Bands, но без неполных окон в начале
+        warmup = np.arange(len(dataframe)) < ma_period - 1
+        dataframe['basis'] = bb_mid.mask(warmup)
+        dataframe['stdev'] = bb_stdev.mask(warmup)
         dataframe['disp_up_ma_period_rsi_period_stdev_multiplier_dispersion'] = (
             (dataframe['close'] - dataframe['basis']) / dataframe['stdev'] * stdev_multiplier
         )
         
         # === Trend indicators (4h, 15m, 6h) ===
-        # Используем информативные пары для расчета трендов
+        # Используем информативные пары для расчета трендов. Берется только последняя
+        # свеча таймфрейма, поэтому ее open/close хранятся скалярами по паре,
+        # а не размножаются в колонки длины всего dataframe
+        trends = {}
         if self.dp:
             try:
-                # 4h тренд
-                inf_4h = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='4h')
-                if not inf_4h.empty:
-                    dataframe['trend_open_4h'] = inf_4h['open'].iloc[-1] if len(inf_4h) > 0 else dataframe['open']
-                    dataframe['trend_close_4h'] = inf_4h['close'].iloc[-1] if len(inf_4h) > 0 else dataframe['close']
-                
-                # 15m тренд
-                inf_15m = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='15m')
-                if not inf_15m.empty:
-                    dataframe['trend_open_15m'] = inf_15m['open'].iloc[-1] if len(inf_15m) > 0 else dataframe['open']
-                    dataframe['trend_close_15m'] = inf_15m['close'].iloc[-1] if len(inf_15m) > 0 else dataframe['close']
-                
-                # 6h тренд
-                inf_6h = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe='6h')
-                if not inf_6h.empty:
-                    dataframe['trend_open_6h'] = inf_6h['open'].iloc[-1] if len(inf_6h) > 0 else dataframe['open']
+                for timeframe in ('4h', '15m', '6h'):
+                    inf = self.dp.get_pair_dataframe(pair=metadata['pair'], timeframe=timeframe)
+                    if not inf.empty:
+                        trends[timeframe] = (float(inf['open'].iloc[-1]), float(inf['close'].iloc[-1]))
             except:
                 pass
-        
-        # Если не удалось получить, используем текущие значения
-        if 'trend_open_4h' not in dataframe.columns:
-            dataframe['trend_open_4h'] = dataframe['open']
-            dataframe['trend_close_4h'] = dataframe['close']
-        if 'trend_open_15m' not in dataframe.columns:
-            dataframe['trend_open_15m'] = dataframe['open']
-            dataframe['trend_close_15m'] = dataframe['close']
-        if 'trend_open_6h' not in dataframe.columns:
-            dataframe['trend_open_6h'] = dataframe['open']
+        self._informative_trends[metadata['pair']] = trends
         
         # === Дополнительные сигналы ===
-        dataframe['low_rsi'] = (dataframe['rsi'] < 30).astype(int)
+        dataframe['low_rsi'] = (dataframe['rsi'] < 30).astype(np.uint8)
         dataframe['silence_silence'] = 0  # Placeholder
         
         # DSL Level (Dynamic Support/Resistance Level)
         dataframe['dsl_lvld'] = dataframe['close'].rolling(20).min()
         
-        # Lower trend
-        dataframe['lower'] = dataframe['low'].rolling(20).min()
+        # Lower trend — тот же 20-периодный минимум low, что и dc_lower
+        dataframe['lower'] = dc_lower
         
         return dataframe
     
+    def _trend_prices(self, dataframe: DataFrame, pair: str, timeframe: str):
+        """
+        (open, close) последней свечи информативного таймфрейма — скаляры;
+        если получить их не удалось, используем текущие значения (колонки dataframe)
+        """
+        trend = self._informative_trends.get(pair, {}).get(timeframe)
+        if trend is None:
+            return dataframe['open'].to_numpy(), dataframe['close'].to_numpy()
+        return trend
+    
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """
         Логика входа на основе множества индикаторов
         """
-        dataframe.loc[
-            (
-                # Bollinger Bands сигналы
-                (dataframe['close'] < dataframe['bb_lowerband3']) |
-                (dataframe['close'] < dataframe['bb_lowerband2']) |
-                
-                # Donchian Channels
-                (dataframe['dca_buy_signal2'] == 1) |
-                (dataframe['close'] > dataframe['dc_lower']) |
-                
-                # RSI сигналы
-                (dataframe['low_rsi'] == 1) |
-                (dataframe['rsi'] < 30) |
-                (dataframe['rsi_fast'] < 25) |
-                
-                # Трендовые сигналы
-                (dataframe['trend_close_4h'] > dataframe['trend_open_4h']) |
-                (dataframe['trend_close_15m'] > dataframe['trend_open_15m']) |
-                
-                # Volume подтверждение
-                (dataframe['volume'] > dataframe['avg_vol'] * 0.8) &
-                
-                # Общие фильтры
-                (dataframe['volume'] > 0) &
-                (dataframe['close'] > dataframe['dc_lower'])
-            ),
-            "enter_long"] = 1
+        # Для скаляров сравнение трендов — один bool вместо сравнения колонок
+        trend_open_4h, trend_close_4h = self._trend_prices(dataframe, metadata['pair'], '4h')
+        trend_open_15m, trend_close_15m = self._trend_prices(dataframe, metadata['pair'], '15m')
+        
+        # Маска собирается на массивах numpy через |= на месте — без промежуточных
+        # Series и выравнивания индексов на каждой операции.
+        # dca_buy_signal2 == 1 и low_rsi == 1 — это те же close > dc_lower и rsi < 30,
+        # а подтверждение объемом (volume > avg_vol * 0.8) & (volume > 0) & (close > dc_lower)
+        # поглощается условием close > dc_lower, поэтому отдельно не проверяются
+        close = dataframe['close'].to_numpy()
+        
+        # Bollinger Bands сигналы
+        enter = close < dataframe['bb_lowerband3'].to_numpy()
+        enter |= close < dataframe['bb_lowerband2'].to_numpy()
+        
+        # Donchian Channels
+        enter |= close > dataframe['dc_lower'].to_numpy()
+        
+        # RSI сигналы
+        enter |= dataframe['rsi'].to_numpy() < 30
+        enter |= dataframe['rsi_fast'].to_numpy() < 25
+        
+        # Трендовые сигналы
+        enter |= trend_close_4h > trend_open_4h
+        enter |= trend_close_15m > trend_open_15m
+        
+        dataframe["enter_long"] = enter.view(np.uint8)
         
         return dataframe
     
@@ -252,25 +288,28 @@ class AdvancedIndicatorStrategy(IStrategy):
         """
         Логика выхода
         """
-        dataframe.loc[
-            (
-                # Bollinger Bands верхняя граница
-                (dataframe['close'] > dataframe['bb_up']) |
-                
-                # RSI перекупленность
-                (dataframe['rsi'] > 70) |
-                (dataframe['rsi_fast'] > 75) |
-                
-                # Donchian Channels верхняя граница
-                (dataframe['close'] > dataframe['dc_upper']) |
-                
-                # Трендовые сигналы
-                (dataframe['trend_close_4h'] < dataframe['trend_open_4h']) |
-                
-                # Volume фильтр
-                (dataframe['volume'] > 0)
-            ),
-            "exit_long"] = 1
+        trend_open_4h, trend_close_4h = self._trend_prices(dataframe, metadata['pair'], '4h')
+        
+        close = dataframe['close'].to_numpy()
+        rsi = dataframe['rsi'].to_numpy()
+        
+        # Bollinger Bands верхняя граница
+        exit_ = close > dataframe['bb_up'].to_numpy()
+        
+        # RSI перекупленность
+        exit_ |= rsi > 70
+        exit_ |= dataframe['rsi_fast'].to_numpy() > 75
+        
+        # Donchian Channels верхняя граница
+        exit_ |= close > dataframe['dc_upper'].to_numpy()
+        
+        # Трендовые сигналы
+        exit_ |= trend_close_4h < trend_open_4h
+        
+        # Volume фильтр
+        exit_ |= dataframe['volume'].to_numpy() > 0
+        
+        dataframe["exit_long"] = exit_.view(np.uint8)
         
         return dataframe
 
@@ -6,6 +6,45 @@ DipBuyStrategy - Стратегия покупки на проливах (dips)
 from freqtrade.strategy import IStrategy, DataFrame
 import pandas as pd
 import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def _rsi_wilder(close, period):
+    """
+    RSI с экспоненциальным сглаживанием Уайлдера за один проход (как talib.RSI):
+    первые средние — простые средние приростов/падений за period свечей,
+    дальше avg = (avg * (period - 1) + value) / period.
+    Пока данных недостаточно (и на полностью плоском участке) — 50
+    """
+    n = close.shape[0]
+    out = np.full(n, 50.0)
+    if n <= period:
+        return out
+    
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        diff = close[i] - close[i - 1]
+        if diff > 0:
+            avg_gain += diff
+        else:
+            avg_loss -= diff
+    avg_gain /= period
+    avg_loss /= period
+    
+    for i in range(period, n):
+        if i > period:
+            diff = close[i] - close[i - 1]
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        total = avg_gain + avg_loss
+        if total != 0:
+            out[i] = 100.0 * avg_gain / total
+    
+    return out
 
 
 class DipBuyStrategy(IStrategy):
@@ -31,15 +70,8 @@ class DipBuyStrategy(IStrategy):
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Add indicators"""
-        # RSI для определения перепроданности
-        delta = dataframe['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        # Избегаем деления на ноль
-        rs = gain / loss.replace(0, np.nan)
-        rs = rs.fillna(0)
-        dataframe['rsi'] = 100 - (100 / (1 + rs.replace(0, np.nan)))
-        dataframe['rsi'] = dataframe['rsi'].fillna(50)  # По умолчанию 50 если нет данных
+        # RSI для определения перепроданности (Уайлдер, 50 если нет данных)
+        dataframe['rsi'] = _rsi_wilder(dataframe['close'].to_numpy(dtype=np.float64), 14)
         
         # Определяем падение за последние N свечей
         dataframe['price_change_pct'] = ((dataframe['close'] - dataframe['close'].shift(5)) / dataframe['close'].shift(5)) * 100
@@ -52,43 +84,33 @@ class DipBuyStrategy(IStrategy):
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Entry on dip with reversal signs"""
-        # Инициализируем колонку
-        dataframe.loc[:, 'enter_long'] = 0
-        
-        dataframe.loc[
-            (
-                # Падение на 1-3%
-                (dataframe['price_change_pct'] <= -1.0) &
-                (dataframe['price_change_pct'] >= -3.0) &
-                # RSI перепродан (ниже 35)
-                (dataframe['rsi'] < 35) &
-                (dataframe['rsi'] > 0) &  # Проверка на валидность
-                # Признаки разворота (цена начала расти)
-                (dataframe['close'] > dataframe['close'].shift(1)) &
-                # Объем выше среднего (интерес покупателей)
-                (dataframe['volume'] > dataframe['volume_ma'] * 0.9) &
-                # Проверка на NaN
-                (dataframe['price_change_pct'].notna()) &
-                (dataframe['volume_ma'].notna())
-            ),
-            'enter_long'
-        ] = 1
+        dataframe['enter_long'] = (
+            # Падение на 1-3%
+            (dataframe['price_change_pct'] <= -1.0) &
+            (dataframe['price_change_pct'] >= -3.0) &
+            # RSI перепродан (ниже 35)
+            (dataframe['rsi'] < 35) &
+            (dataframe['rsi'] > 0) &  # Проверка на валидность
+            # Признаки разворота (цена начала расти)
+            (dataframe['close'] > dataframe['close'].shift(1)) &
+            # Объем выше среднего (интерес покупателей)
+            # (проверки notna не нужны: сравнение с NaN в price_change_pct
+            # и volume_ma уже дает False)
+            (dataframe['volume'] > dataframe['volume_ma'] * 0.9)
+        ).to_numpy().astype(np.uint8)
         
         return dataframe
     
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Exit on recovery or stop"""
-        dataframe.loc[
-            (
-                # Цена восстановилась (прибыль)
-                (dataframe['price_change_pct'] > 0) |
-                # RSI перекуплен (выход с прибылью)
-                (dataframe['rsi'] > 70) |
-                # Дальнейшее падение (стоп)
-                (dataframe['price_change_pct'] < -4.0)
-            ),
-            'exit_long'
-        ] = 1
+        dataframe['exit_long'] = (
+            # Цена восстановилась (прибыль)
+            (dataframe['price_change_pct'] > 0) |
+            # RSI перекуплен (выход с прибылью)
+            (dataframe['rsi'] > 70) |
+            # Дальнейшее падение (стоп)
+            (dataframe['price_change_pct'] < -4.0)
+        ).to_numpy().astype(np.uint8)
         
         return dataframe
 
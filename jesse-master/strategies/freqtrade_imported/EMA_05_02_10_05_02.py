@@ -11,9 +11,101 @@ from freqtrade.strategy.interface import IStrategy
 from pandas import DataFrame
 import pandas as pd
 import numpy as np
+from numba import njit
 from typing import Optional
 
 
+@njit(cache=True)
+def _ewm_step(weighted, old_wt, cur, alpha):
+    """
+    Один шаг рекурренты close.ewm(adjust=False).mean() из pandas (ignore_na=False):
+    возвращает новые (weighted, old_wt)
+    """
+    if weighted == weighted:
+        old_wt *= 1.0 - alpha
+        if cur == cur:
+            # Для постоянного ряда значение не пересчитывается (как в pandas)
+            if weighted != cur:
+                weighted = old_wt * weighted + alpha * cur
+                weighted /= (old_wt + alpha)
+            old_wt = 1.0
+    elif cur == cur:
+        weighted = cur
+    return weighted, old_wt
+
+
+@njit(cache=True)
+def _triple_ema(close, span1, span2, span3):
+    """
+    Три EMA(close) за один проход по массиву — та же рекуррента, что и
+    close.ewm(span=..., adjust=False).mean() в pandas (включая обработку NaN),
+    поэтому результат совпадает бит в бит. Возвращает массив (3, N)
+    """
+    n = close.shape[0]
+    out = np.empty((3, n))
+    if n == 0:
+        return out
+    
+    # alpha = 1 / (1 + com), com = (span - 1) / 2 — как в pandas
+    alpha1 = 1.0 / (1.0 + (span1 - 1.0) / 2.0)
+    alpha2 = 1.0 / (1.0 + (span2 - 1.0) / 2.0)
+    alpha3 = 1.0 / (1.0 + (span3 - 1.0) / 2.0)
+    
+    # До первого не-NaN значения weighted остается NaN — это и есть выход pandas
+    e1 = e2 = e3 = close[0]
+    w1 = w2 = w3 = 1.0
+    out[0, 0] = out[1, 0] = out[2, 0] = e1
+    for i in range(1, n):
+        cur = close[i]
+        # Три независимые рекурренты в одном цикле — их задержки перекрываются
+        e1, w1 = _ewm_step(e1, w1, cur, alpha1)
+        e2, w2 = _ewm_step(e2, w2, cur, alpha2)
+        e3, w3 = _ewm_step(e3, w3, cur, alpha3)
+        out[0, i] = e1
+        out[1, i] = e2
+        out[2, i] = e3
+    
+    return out
+
+
+@njit(cache=True)
+def _rsi_wilder(close, period):
+    """
+    RSI с экспоненциальным сглаживанием Уайлдера за один проход (как talib.RSI):
+    первые средние — простые средние приростов/падений за period свечей,
+    дальше avg = (avg * (period - 1) + value) / period.
+    Пока данных недостаточно (и на полностью плоском участке) — 50
+    """
+    n = close.shape[0]
+    out = np.full(n, 50.0)
+    if n <= period:
+        return out
+    
+    avg_gain = 0.0
+    avg_loss = 0.0
+    for i in range(1, period + 1):
+        diff = close[i] - close[i - 1]
+        if diff > 0:
+            avg_gain += diff
+        else:
+            avg_loss -= diff
+    avg_gain /= period
+    avg_loss /= period
+    
+    for i in range(period, n):
+        if i > period:
+            diff = close[i] - close[i - 1]
+            gain = diff if diff > 0 else 0.0
+            loss = -diff if diff < 0 else 0.0
+            avg_gain = (avg_gain * (period - 1) + gain) / period
+            avg_loss = (avg_loss * (period - 1) + loss) / period
+        total = avg_gain + avg_loss
+        if total != 0:
+            out[i] = 100.0 * avg_gain / total
+    
+    return out
+
+
 class EMA_05_02_10_05_02(IStrategy):
     """
     Очень чувствительная EMA стратегия для 30-секундного таймфрейма:
@@ -47,14 +139,13 @@ class EMA_05_02_10_05_02(IStrategy):
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Добавляем EMA индикаторы"""
-        # Быстрая EMA для отслеживания краткосрочных движений
-        dataframe['ema_fast'] = dataframe['close'].ewm(span=9, adjust=False).mean()
-        
-        # Средняя EMA для определения тренда
-        dataframe['ema_medium'] = dataframe['close'].ewm(span=21, adjust=False).mean()
-        
-        # Медленная EMA для долгосрочного тренда
-        dataframe['ema_slow'] = dataframe['close'].ewm(span=50, adjust=False).mean()
+        # Быстрая (9), средняя (21) и медленная (50) EMA считаются одним проходом:
+        # быстрая — краткосрочные движения, средняя — тренд, медленная — долгосрочный тренд
+        close = dataframe['close'].to_numpy(dtype=np.float64)
+        emas = _triple_ema(close, 9, 21, 50)
+        dataframe['ema_fast'] = emas[0]
+        dataframe['ema_medium'] = emas[1]
+        dataframe['ema_slow'] = emas[2]
         
         # Процентное отклонение от EMA
         dataframe['price_deviation_pct'] = ((dataframe['close'] - dataframe['ema_fast']) / dataframe['ema_fast']) * 100
@@ -68,71 +159,62 @@ class EMA_05_02_10_05_02(IStrategy):
         dataframe['volume_ma'] = dataframe['volume'].rolling(window=20).mean()
         dataframe['volume_ratio'] = dataframe['volume'] / dataframe['volume_ma']
         
-        # RSI для определения перепроданности
-        delta = dataframe['close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=14).mean()
-        rs = gain / loss.replace(0, np.nan)
-        rs = rs.fillna(0)
-        dataframe['rsi'] = 100 - (100 / (1 + rs.replace(0, np.nan)))
-        dataframe['rsi'] = dataframe['rsi'].fillna(50)
+        # RSI для определения перепроданности (Уайлдер, 50 если нет данных)
+        dataframe['rsi'] = _rsi_wilder(close, 14)
         
         return dataframe
     
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Вход при просадке 0.5% от EMA"""
-        dataframe.loc[:, 'enter_long'] = 0
+        # В live/dry_run сигнал берется только с последней свечи: если на ней нет
+        # восходящего тренда (ema_fast > ema_medium > ema_slow), входа точно не будет,
+        # и полную маску по всем строкам можно не строить
+        if self.dp and self.dp.runmode.value in ("live", "dry_run") and len(dataframe) > 0:
+            ema_fast = dataframe['ema_fast'].iat[-1]
+            ema_medium = dataframe['ema_medium'].iat[-1]
+            if not (ema_fast > ema_medium and ema_medium > dataframe['ema_slow'].iat[-1]):
+                dataframe['enter_long'] = np.zeros(len(dataframe), dtype=np.uint8)
+                return dataframe
         
-        dataframe.loc[
-            (
-                # Просадка 0.5% от быстрой EMA (в пределах 0.4-0.6%)
-                (dataframe['price_deviation_pct'] <= -0.4) &
-                (dataframe['price_deviation_pct'] >= -0.6) &
-                
-                # Восходящий тренд (быстрая EMA выше средней)
-                (dataframe['ema_fast'] > dataframe['ema_medium']) &
-                
-                # Средняя EMA выше медленной (подтверждение тренда)
-                (dataframe['ema_medium'] > dataframe['ema_slow']) &
-                
-                # Признаки разворота (цена начала расти)
-                (dataframe['close'] > dataframe['close'].shift(1)) &
-                
-                # RSI не перекуплен (ниже 70)
-                (dataframe['rsi'] < 70) &
-                (dataframe['rsi'] > 30) &
-                
-                # Объем выше среднего (интерес покупателей)
-                (dataframe['volume_ratio'] > 0.8) &
-                
-                # Проверка на валидность данных
-                (dataframe['price_deviation_pct'].notna()) &
-                (dataframe['ema_fast'].notna()) &
-                (dataframe['volume_ratio'].notna())
-            ),
-            'enter_long'
-        ] = 1
+        dataframe['enter_long'] = (
+            # Просадка 0.5% от быстрой EMA (в пределах 0.4-0.6%)
+            (dataframe['price_deviation_pct'] <= -0.4) &
+            (dataframe['price_deviation_pct'] >= -0.6) &
+            
+            # Восходящий тренд (быстрая EMA выше средней)
+            (dataframe['ema_fast'] > dataframe['ema_medium']) &
+            
+            # Средняя EMA выше медленной (подтверждение тренда)
+            (dataframe['ema_medium'] > dataframe['ema_slow']) &
+            
+            # Признаки разворота (цена начала расти)
+            (dataframe['close'] > dataframe['close'].shift(1)) &
+            
+            # RSI не перекуплен (ниже 70)
+            (dataframe['rsi'] < 70) &
+            (dataframe['rsi'] > 30) &
+            
+            # Объем выше среднего (интерес покупателей)
+            # (отдельные проверки notna не нужны: сравнение с NaN уже дает False
+            # для price_deviation_pct, ema_fast и volume_ratio)
+            (dataframe['volume_ratio'] > 0.8)
+        ).to_numpy().astype(np.uint8)
         
         return dataframe
     
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Выход по тейк-профиту или стоп-лоссу (трейлинг обрабатывается автоматически)"""
-        dataframe.loc[:, 'exit_long'] = 0
-        
         # Выход при достижении тейк-профита или при развороте тренда
-        dataframe.loc[
-            (
-                # Разворот тренда (быстрая EMA ниже средней)
-                (dataframe['ema_fast'] < dataframe['ema_medium']) |
-                
-                # RSI перекуплен (выше 70)
-                (dataframe['rsi'] > 70) |
-                
-                # Цена значительно выше EMA (перекупленность)
-                (dataframe['price_deviation_pct'] > 2.0)
-            ),
-            'exit_long'
-        ] = 1
+        dataframe['exit_long'] = (
+            # Разворот тренда (быстрая EMA ниже средней)
+            (dataframe['ema_fast'] < dataframe['ema_medium']) |
+            
+            # RSI перекуплен (выше 70)
+            (dataframe['rsi'] > 70) |
+            
+            # Цена значительно выше EMA (перекупленность)
+            (dataframe['price_deviation_pct'] > 2.0)
+        ).to_numpy().astype(np.uint8)
         
         return dataframe
     
@@ -9,10 +9,73 @@ EMA Pullback Strategy - Custom EMA strategy with pullback rules
 from freqtrade.strategy.interface import IStrategy
 from typing import Dict, List
 from pandas import DataFrame
-import talib.abstract as ta
+import talib
 import numpy as np
+from numba import njit
 from freqtrade.persistence import Trade
 
+
+# error_model='numpy': division by zero gives inf/nan like pandas instead of raising
+@njit(cache=True, error_model='numpy')
+def _pullback_features(high, low, close, window):
+    """
+    One pass over high/low/close producing price_change_pct, rolling_min_30s,
+    rolling_max_30s and drop_from_high, matching the pandas expressions
+    (pct_change(), rolling(window).min()/max(), (high - close) / high).
+    Rolling min/max use monotonic index deques; a window that is not full
+    or contains a NaN gives NaN, as with pandas' min_periods=window.
+    """
+    n = close.shape[0]
+    price_change = np.empty(n)
+    rolling_min = np.empty(n)
+    rolling_max = np.empty(n)
+    drop = np.empty(n)
+    
+    # Deques of candle indices with increasing low / decreasing high;
+    # indices only move forward, so plain arrays with head/tail pointers suffice
+    min_idx = np.empty(n, dtype=np.int64)
+    max_idx = np.empty(n, dtype=np.int64)
+    min_head = min_tail = 0
+    max_head = max_tail = 0
+    last_nan_low = -1
+    last_nan_high = -1
+    
+    for i in range(n):
+        if i > 0:
+            price_change[i] = close[i] / close[i - 1] - 1.0
+        else:
+            price_change[i] = np.nan
+        drop[i] = (high[i] - close[i]) / high[i]
+        
+        lo = low[i]
+        if lo != lo:
+            last_nan_low = i
+        else:
+            while min_tail > min_head and low[min_idx[min_tail - 1]] >= lo:
+                min_tail -= 1
+            min_idx[min_tail] = i
+            min_tail += 1
+        if min_tail > min_head and min_idx[min_head] <= i - window:
+            min_head += 1
+        
+        hi = high[i]
+        if hi != hi:
+            last_nan_high = i
+        else:
+            while max_tail > max_head and high[max_idx[max_tail - 1]] <= hi:
+                max_tail -= 1
+            max_idx[max_tail] = i
+            max_tail += 1
+        if max_tail > max_head and max_idx[max_head] <= i - window:
+            max_head += 1
+        
+        full = i >= window - 1
+        rolling_min[i] = low[min_idx[min_head]] if full and last_nan_low <= i - window else np.nan
+        rolling_max[i] = high[max_idx[max_head]] if full and last_nan_high <= i - window else np.nan
+    
+    return price_change, rolling_min, rolling_max, drop
+
+
 class EMA_PullbackStrategy(IStrategy):
     """
     Custom EMA strategy with pullback detection and DCA entry
@@ -53,22 +116,31 @@ class EMA_PullbackStrategy(IStrategy):
     
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Add indicators"""
-        # EMA for trend detection
-        dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
+        # talib (close, volume) and _pullback_features (high, low, close) want
+        # C-contiguous float64; convert those columns once instead of per call
+        for col in ('high', 'low', 'close', 'volume'):
+            values = dataframe[col].to_numpy()
+            if values.dtype != np.float64 or not values.flags['C_CONTIGUOUS']:
+                dataframe[col] = np.ascontiguousarray(values, dtype=np.float64)
         
-        # Price change percentage (for pullback detection)
-        dataframe['price_change_pct'] = dataframe['close'].pct_change()
+        close = dataframe['close'].to_numpy()
         
-        # Rolling min/max for pullback detection
-        dataframe['rolling_min_30s'] = dataframe['low'].rolling(window=30).min()
-        dataframe['rolling_max_30s'] = dataframe['high'].rolling(window=30).max()
+        # EMA for trend detection
+        dataframe['ema_20'] = talib.EMA(close, timeperiod=20)
+        dataframe['ema_50'] = talib.EMA(close, timeperiod=50)
         
-        # Calculate drop percentage
-        dataframe['drop_from_high'] = (dataframe['high'] - dataframe['close']) / dataframe['high']
+        # Price change percentage, 30-candle rolling min/max and drop percentage
+        # for pullback detection, computed in a single pass
+        price_change, rolling_min, rolling_max, drop = _pullback_features(
+            dataframe['high'].to_numpy(), dataframe['low'].to_numpy(), close, 30
+        )
+        dataframe['price_change_pct'] = price_change
+        dataframe['rolling_min_30s'] = rolling_min
+        dataframe['rolling_max_30s'] = rolling_max
+        dataframe['drop_from_high'] = drop
         
         # Volume for confirmation
-        dataframe['volume_sma'] = ta.SMA(dataframe, timeperiod=20, column='volume')
+        dataframe['volume_sma'] = talib.SMA(dataframe['volume'].to_numpy(), timeperiod=20)
         
         return dataframe
     
@@ -94,7 +166,7 @@ class EMA_PullbackStrategy(IStrategy):
         # These will be handled by position_adjustment_enable
         
         if conditions:
-            dataframe.loc[conditions[0], 'buy'] = 1
+            dataframe['buy'] = conditions[0].to_numpy().astype(np.uint8)
         
         return dataframe
     
@@ -152,13 +224,11 @@ class EMA_PullbackStrategy(IStrategy):
     
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         """Exit conditions"""
-        dataframe.loc[
-            (
-                # Price recovered above EMA
-                (dataframe['close'] > dataframe['ema_20']) &
-                (dataframe['close'] > dataframe['ema_50'])
-            ),
-            'sell'] = 1
+        dataframe['sell'] = (
+            # Price recovered above EMA
+            (dataframe['close'] > dataframe['ema_20']) &
+            (dataframe['close'] > dataframe['ema_50'])
+        ).to_numpy().astype(np.uint8)
         
         return dataframe
 
@@ -0,0 +1,92 @@
+import random
+
+import numpy as np
+
+from jesse.services.ninja_score import (
+    NINJA_WEIGHTS,
+    calculate_ninja_score,
+    calculate_ninja_scores_batch,
+    get_ninja_score_color,
+    get_ninja_score_colors
+)
+
+
+def _random_metrics(rng: random.Random) -> dict:
+    return {
+        "total_trades": rng.randint(0, 3000),
+        "total_net_profit_percentage": rng.uniform(-100, 400),
+        "win_rate": rng.choice([0, 100, rng.uniform(0, 100)]),
+        "max_drawdown_percentage": rng.uniform(-80, 0),
+        "sharpe_ratio": rng.uniform(-3, 5),
+        "sortino_ratio": rng.uniform(-3, 5),
+        "calmar_ratio": rng.uniform(-3, 5),
+        "expectancy": rng.uniform(-1, 1),
+        "profit_factor": rng.uniform(0, 4),
+        "cagr": rng.uniform(-50, 300),
+    }
+
+
+def test_batch_matches_scalar_on_random_metrics():
+    rng = random.Random(0)
+    metrics_list = [_random_metrics(rng) for _ in range(2000)]
+    metrics_list += [{}, None, {"total_trades": 1}, {"win_rate": 100}]
+
+    scores, categories = calculate_ninja_scores_batch(metrics_list)
+
+    for metrics, score, category in zip(metrics_list, scores.tolist(), categories.tolist()):
+        expected = calculate_ninja_score(metrics)
+        assert score == expected.ninja_score
+        assert category == expected.category
+
+
+def test_batch_empty_metrics_are_poor():
+    scores, categories = calculate_ninja_scores_batch([{}, None])
+
+    assert scores.tolist() == [0, 0]
+    assert categories.tolist() == ["Poor", "Poor"]
+    assert calculate_ninja_score({}).category == "Poor"
+
+
+def test_batch_category_uses_unrounded_score():
+    # drawdown of 0.008% gives a score of -0.004, which rounds to -0.0
+    metrics = {"max_drawdown_percentage": -0.008}
+
+    scores, categories = calculate_ninja_scores_batch([metrics])
+    expected = calculate_ninja_score(metrics)
+
+    assert expected.category == "Poor"
+    assert categories[0] == "Poor"
+    assert scores[0] == expected.ninja_score
+
+
+def test_batch_empty_list():
+    scores, categories = calculate_ninja_scores_batch([])
+
+    assert scores.shape == (0,)
+    assert categories.shape == (0,)
+
+
+def test_batch_returns_float_scores():
+    scores, _ = calculate_ninja_scores_batch([{"total_trades": 10, "win_rate": 50}])
+
+    assert scores.dtype == np.float64
+
+
+def test_ninja_result_as_dict():
+    result = calculate_ninja_score({"total_trades": 20, "win_rate": 50})
+    legacy = result.as_dict()
+
+    assert legacy["ninja_score"] == result.ninja_score
+    assert legacy["category"] == result.category
+    assert list(legacy["breakdown"]) == list(NINJA_WEIGHTS)
+    assert legacy["breakdown"]["total_trades"] == 9
+    assert sum(legacy["breakdown"].values()) == result.ninja_score
+    assert calculate_ninja_score({}).as_dict()["breakdown"] == {}
+
+
+def test_get_ninja_score_colors_matches_scalar():
+    scores = np.array([-50, -0.01, 0, 0.01, 199.99, 200, 499.99, 500, 1000, np.nan])
+
+    colors = get_ninja_score_colors(scores)
+
+    assert colors.tolist() == [get_ninja_score_color(s) for s in scores.tolist()]
@@ -0,0 +1,38 @@
+import numpy as np
+
+import jesse.indicators as ta
+from jesse.strategies import StreamingIndicators
+
+
+class _Host(StreamingIndicators):
+    def __init__(self) -> None:
+        self.vars = {}
+
+
+def _random_candles(n: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    open_ = np.r_[close[0], close[:-1]]
+    ts = 1609459200000 + np.arange(n) * 60000
+    return np.column_stack([ts, open_, close, close * 1.001, close * 0.999, rng.random(n) * 100])
+
+
+def test_ema_last_matches_ema_bar_by_bar():
+    candles = _random_candles(400)
+    host = _Host()
+
+    for n in range(250, 400):
+        assert host._ema_last(candles[:n], 50) == ta.ema(candles[:n], period=50, sequential=True)[-1]
+
+    # a shifted candle window is recomputed in full
+    assert host._ema_last(candles[100:], 50) == ta.ema(candles[100:], period=50, sequential=True)[-1]
+
+
+def test_volume_means_match_slices_bar_by_bar():
+    candles = _random_candles(200)
+    host = _Host()
+
+    for n in range(30, 200):
+        mean_12, mean_23 = host._volume_means(candles[:n])
+        assert np.isclose(mean_12, candles[n - 12:n, 5].mean())
+        assert np.isclose(mean_23, candles[n - 24:n - 1, 5].mean())